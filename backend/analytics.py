@@ -0,0 +1,154 @@
+"""Columnar in-memory snapshot of the metrics table for ranking and comparison queries.
+
+Metrics are held as district x month NumPy arrays, so rankings, percentiles, month-over-month
+deltas, performance banding and state totals are vectorised and never touch Postgres. The
+snapshot is rebuilt lazily after a write invalidates it (or after max_age seconds, which picks up
+writes made by other processes). NumPy is only imported with this module, which the server loads on
+first use.
+"""
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+INTEGER_FIELDS = {'households_covered'}
+
+
+def to_python(values: np.ndarray, integer: bool = False) -> List[Optional[float]]:
+    """Plain numbers for JSON responses, None where a value is missing"""
+    cast = int if integer else float
+    return [None if np.isnan(v) else cast(v) for v in values]
+
+
+class MetricsSnapshot:
+    """District x month arrays for every metric field, plus each district's newest month"""
+
+    def __init__(self, district_ids: Sequence[str], rows: Sequence[tuple], fields: Sequence[str]):
+        # rows: (district_id, year, month, *fields)
+        self.district_ids = np.array(sorted(set(district_ids) | {r[0] for r in rows}), dtype=object)
+        self.built_at = time.time()
+        columns = list(zip(*rows)) if rows else [()] * (3 + len(fields))
+        row_districts = np.array(columns[0], dtype=object)
+        periods = np.array(columns[1], dtype=np.int64) * 12 + np.array(columns[2], dtype=np.int64) - 1
+
+        self.periods, p_idx = np.unique(periods, return_inverse=True)
+        d_idx = np.searchsorted(self.district_ids, row_districts) if rows else np.array([], dtype=np.int64)
+        shape = (len(self.district_ids), len(self.periods))
+
+        self.present = np.zeros(shape, dtype=bool)
+        self.present[d_idx, p_idx] = True
+        self.values: Dict[str, np.ndarray] = {}
+        for i, field in enumerate(fields):
+            grid = np.full(shape, np.nan)
+            grid[d_idx, p_idx] = np.array(columns[3 + i], dtype=float)  # None -> nan
+            self.values[field] = grid
+        # Missing performance counts as 0, as in the SQL paths
+        perf = self.values['performance_index']
+        perf[self.present & np.isnan(perf)] = 0.0
+
+        self.has_metrics = self.present.any(axis=1)
+        # Index of each district's newest month (0 for districts without metrics; masked by has_metrics)
+        if shape[1]:
+            self.latest_idx = np.where(self.has_metrics, shape[1] - 1 - np.argmax(self.present[:, ::-1], axis=1), 0)
+        else:
+            self.latest_idx = np.zeros(shape[0], dtype=np.int64)
+
+    def latest(self, field: str) -> np.ndarray:
+        """Newest value of field per district (nan where a district has no metrics)"""
+        if not len(self.periods):
+            return np.full(len(self.district_ids), np.nan)
+        values = self.values[field][np.arange(len(self.district_ids)), self.latest_idx]
+        return np.where(self.has_metrics, values, np.nan)
+
+    def latest_values(self, field: str) -> List[Optional[float]]:
+        return to_python(self.latest(field), integer=field in INTEGER_FIELDS)
+
+    def month_over_month(self, field: str) -> np.ndarray:
+        """Change from the calendar month before each district's newest month (nan if either is missing)"""
+        current = self.latest(field)
+        if not len(self.periods):
+            return current
+        previous_period = self.periods[self.latest_idx] - 1
+        prev_idx = np.searchsorted(self.periods, previous_period)
+        found = (prev_idx < len(self.periods)) & (self.periods[np.minimum(prev_idx, len(self.periods) - 1)] == previous_period)
+        rows = np.arange(len(self.district_ids))
+        previous = np.where(found, self.values[field][rows, np.minimum(prev_idx, len(self.periods) - 1)], np.nan)
+        return current - previous
+
+    def month_over_month_values(self, field: str) -> List[Optional[float]]:
+        return to_python(self.month_over_month(field))
+
+    def categories(self) -> np.ndarray:
+        """high / medium / low banding of every district's newest performance_index"""
+        perf = self.latest('performance_index')
+        return np.select([perf >= 90, perf < 75], ['high', 'low'], 'medium')
+
+    def category_counts(self) -> Dict[str, int]:
+        names, counts = np.unique(self.categories(), return_counts=True)
+        return {str(n): int(c) for n, c in zip(names, counts)}
+
+    def rankings(self, field: str, descending: bool = True) -> List[Tuple[str, float, int]]:
+        """(district_id, value, rank) ordered by the newest value; districts without data come last"""
+        values = self.latest(field)
+        keys = np.where(np.isnan(values), np.inf, -values if descending else values)
+        order = np.lexsort((self.district_ids.astype(str), keys))
+        return [(self.district_ids[i], None if np.isnan(values[i]) else float(values[i]), rank)
+                for rank, i in enumerate(order, start=1)]
+
+    def percentiles(self, field: str, qs: Sequence[float]) -> Dict[str, Optional[float]]:
+        values = self.latest(field)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return {f"p{q:g}": None for q in qs}
+        return {f"p{q:g}": float(v) for q, v in zip(qs, np.percentile(values, qs))}
+
+    def state_totals(self) -> dict:
+        """Same figures as /metrics/state: sums and average over each district's newest month"""
+        perf = self.latest('performance_index')
+        with_data = ~np.isnan(perf)
+        if not with_data.any():
+            return {"total_job_days": 0, "total_households": 0, "total_wages": 0, "avg_performance": 0,
+                    "best_district": None, "worst_district": None}
+        ranked = self.rankings('performance_index')
+        return {
+            "total_job_days": float(np.nansum(self.latest('total_job_days'))),
+            "total_households": int(np.nansum(self.latest('households_covered'))),
+            "total_wages": float(np.nansum(self.latest('wages_paid'))),
+            "avg_performance": round(float(perf[with_data].mean()), 2),
+            "best_district": ranked[0][0],
+            "worst_district": self.rankings('performance_index', descending=False)[0][0],
+        }
+
+
+class SnapshotStore:
+    """Holds the current MetricsSnapshot and rebuilds it once per invalidation, coalescing concurrent callers"""
+
+    def __init__(self, loader: Callable[[], Awaitable[Tuple[List[str], List[tuple]]]], fields: Sequence[str],
+                 max_age: float = 300.0):
+        self.loader = loader
+        self.fields = tuple(fields)
+        self.max_age = max_age
+        self._snapshot: Optional[MetricsSnapshot] = None
+        self._lock = asyncio.Lock()
+        self._generation = 0
+
+    async def get(self) -> MetricsSnapshot:
+        snapshot = self._snapshot
+        if snapshot is not None and time.time() - snapshot.built_at < self.max_age:
+            return snapshot
+        async with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and time.time() - snapshot.built_at < self.max_age:
+                return snapshot
+            generation = self._generation
+            district_ids, rows = await self.loader()
+            snapshot = MetricsSnapshot(district_ids, rows, self.fields)
+            # A write that landed while loading leaves the store stale so the next call reloads
+            if generation == self._generation:
+                self._snapshot = snapshot
+            return snapshot
+
+    def invalidate(self):
+        self._snapshot = None
+        self._generation += 1
@@ -0,0 +1,76 @@
+"""Rows/second of the bulk loader against ORM add_all on synthetic metrics.
+
+Uses the database from DATABASE_URL; synthetic districts (BENCH*) and their metrics are removed afterwards.
+
+    python -m benchmarks.bulk_load --rows 1000000 --orm-rows 50000
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+from sqlalchemy import delete, insert
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from bulk_load import BULK_LOAD_BATCH_SIZE, load_metric_rows  # noqa: E402
+from server import (AsyncSessionLocal, DistrictORM, MetricORM,  # noqa: E402
+                    create_tables, engine, metric_partitions,
+                    mock_metric_rows, refresh_rollups, run_migrations)
+
+MONTHS_PER_DISTRICT = 500
+
+
+def bench_district_ids(rows):
+    return [f"BENCH{i:05d}" for i in range(-(-rows // MONTHS_PER_DISTRICT))]
+
+
+async def cleanup(district_ids):
+    async with engine.begin() as conn:
+        await conn.execute(delete(MetricORM).where(MetricORM.district_id.in_(district_ids)))
+        # The rollup rows reference the districts, so empty them before the districts go
+        await refresh_rollups(conn, district_ids=district_ids)
+        await conn.execute(delete(DistrictORM).where(DistrictORM.id.in_(district_ids)))
+
+
+async def main(rows, orm_rows, batch_size):
+    async with engine.begin() as conn:
+        await conn.run_sync(create_tables)
+        await run_migrations(conn)
+
+    district_ids = bench_district_ids(rows)
+    await cleanup(district_ids)
+    async with AsyncSessionLocal() as session:
+        await session.execute(insert(DistrictORM), [{"id": d, "name_en": d, "name_kn": d, "feature": "bench"} for d in district_ids])
+        await session.commit()
+    # The bulk loader creates year partitions itself; the ORM path needs them up front
+    async with engine.connect() as conn:
+        await metric_partitions.ensure(conn, {row['year'] for row in mock_metric_rows(district_ids[:1], MONTHS_PER_DISTRICT)})
+
+    try:
+        orm_ids = bench_district_ids(orm_rows)
+        start = time.perf_counter()
+        async with AsyncSessionLocal() as session:
+            session.add_all(MetricORM(**row) for row in mock_metric_rows(orm_ids, MONTHS_PER_DISTRICT))
+            await session.commit()
+        orm_elapsed = time.perf_counter() - start
+        print(f"ORM add_all: {orm_rows:,} rows in {orm_elapsed:.1f}s -> {orm_rows / orm_elapsed:,.0f} rows/s")
+
+        # Reloading the same months exercises the upsert path as well as fresh inserts
+        start = time.perf_counter()
+        loaded = await load_metric_rows(mock_metric_rows(district_ids, MONTHS_PER_DISTRICT), batch_size)
+        bulk_elapsed = time.perf_counter() - start
+        print(f"bulk loader ({engine.dialect.name}, batch {batch_size}): {loaded:,} rows in {bulk_elapsed:.1f}s "
+              f"-> {loaded / bulk_elapsed:,.0f} rows/s")
+    finally:
+        await cleanup(district_ids)
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--orm-rows', type=int, default=50_000)
+    parser.add_argument('--batch-size', type=int, default=BULK_LOAD_BATCH_SIZE)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.orm_rows, args.batch_size))
@@ -0,0 +1,57 @@
+"""Measure bandwidth and throughput of full responses versus ETag revalidations (304).
+
+Run against a live server:
+
+    python -m benchmarks.conditional_get --base-url http://localhost:8000 --requests 2000 --concurrency 50
+"""
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+PATHS = ['/api/metrics/state', '/api/metrics/comparison', '/api/districts/KA01']
+
+
+def run(url, total, concurrency, etag=None):
+    headers = {'If-None-Match': etag} if etag else {}
+    session = requests.Session()
+    session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=concurrency))
+
+    def one(_):
+        start = time.perf_counter()
+        r = session.get(url, headers=headers)
+        return r.status_code, len(r.content), (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - start
+    latencies = sorted(r[2] for r in results)
+    return {
+        "status": sorted({r[0] for r in results}),
+        "body_bytes": sum(r[1] for r in results),
+        "req_per_s": round(total / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1], 2),
+    }
+
+
+def main(base_url, total, concurrency):
+    for path in PATHS:
+        url = base_url.rstrip('/') + path
+        etag = requests.get(url).headers.get('ETag')
+        full = run(url, total, concurrency)
+        revalidated = run(url, total, concurrency, etag)
+        saved = 1 - revalidated["body_bytes"] / full["body_bytes"] if full["body_bytes"] else 0
+        print(f"{path}\n  full:        {full}\n  revalidated: {revalidated}\n  body bytes saved: {saved:.1%}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--base-url', default='http://localhost:8000')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    args = parser.parse_args()
+    main(args.base_url, args.requests, args.concurrency)
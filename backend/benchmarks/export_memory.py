@@ -0,0 +1,81 @@
+"""Check that streaming export memory stays flat as the metrics table grows.
+
+Seeds synthetic districts (BENCH*) through the bulk loader at each size, streams every export format
+through the same encoders the endpoint uses, and reports the Python heap peak (tracemalloc) and the
+process peak RSS. Exits non-zero if any export's heap peak exceeds --max-peak-mb.
+
+    python -m benchmarks.export_memory --sizes 10000 1000000
+"""
+import argparse
+import asyncio
+import resource
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+from sqlalchemy import insert, select
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from benchmarks.bulk_load import MONTHS_PER_DISTRICT, bench_district_ids, cleanup  # noqa: E402
+from bulk_load import load_metric_rows  # noqa: E402
+from server import (AsyncSessionLocal, DistrictORM, MetricORM,  # noqa: E402
+                    OrmDataAccess, create_tables, encode_csv, encode_ndjson,
+                    encode_parquet, engine, mock_metric_rows, run_migrations,
+                    stream_metric_chunks)
+
+ENCODERS = {"csv": encode_csv, "ndjson": encode_ndjson, "parquet": encode_parquet}
+
+
+async def seed(rows):
+    district_ids = bench_district_ids(rows)
+    await cleanup(district_ids)
+    async with AsyncSessionLocal() as session:
+        await session.execute(insert(DistrictORM), [{"id": d, "name_en": d, "name_kn": d, "feature": "bench"} for d in district_ids])
+        await session.commit()
+    await load_metric_rows(mock_metric_rows(district_ids, MONTHS_PER_DISTRICT))
+    return district_ids
+
+
+async def export(fmt, district_ids):
+    stmt = select(*OrmDataAccess.metric_columns).where(MetricORM.district_id.in_(district_ids)) \
+        .order_by(MetricORM.district_id, MetricORM.year, MetricORM.month)
+    columns = [c.key for c in OrmDataAccess.metric_columns]
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    size = 0
+    async for part in ENCODERS[fmt](stream_metric_chunks(stmt), columns):
+        size += len(part)
+    return size, time.perf_counter() - start, tracemalloc.get_traced_memory()[1]
+
+
+async def main(sizes, max_peak_mb):
+    async with engine.begin() as conn:
+        await conn.run_sync(create_tables)
+        await run_migrations(conn)
+
+    tracemalloc.start()
+    failed = False
+    for rows in sizes:
+        district_ids = await seed(rows)
+        try:
+            for fmt in ENCODERS:
+                size, elapsed, peak = await export(fmt, district_ids)
+                rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+                peak_mb = peak / 1024 / 1024
+                failed |= peak_mb > max_peak_mb
+                print(f"{rows:>10,} rows {fmt:>8}: {size / 1e6:8.1f} MB out in {elapsed:6.1f}s, "
+                      f"heap peak {peak_mb:6.1f} MB, process peak RSS {rss_mb:7.1f} MB")
+        finally:
+            await cleanup(district_ids)
+    await engine.dispose()
+    if failed:
+        sys.exit(f"export heap peak exceeded {max_peak_mb} MB")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 1_000_000])
+    parser.add_argument('--max-peak-mb', type=float, default=64)
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes, args.max_peak_mb))
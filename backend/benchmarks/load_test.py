@@ -0,0 +1,234 @@
+"""Load test every GET /api route on synthetic data and report per-route latency and DB usage as JSON.
+
+Seeds N districts x M months (server.seed_districts / generate_mock_metrics) into a throwaway
+database, starts `uvicorn server:app` on it and drives each route with concurrent clients. For every
+route the report gives throughput, p50/p95/p99 latency, errors, and queries / DB time per request
+from /api/db/stats. With --baseline the run fails if any route's p95 regressed by more than
+--tolerance, so CI can compare runs.
+
+    python -m benchmarks.load_test --districts 30 --months 24                  # SQLite via aiosqlite
+    python -m benchmarks.load_test --db postgres --districts 300 --months 180  # throwaway local Postgres
+    python -m benchmarks.load_test --database-url postgresql+asyncpg://...     # existing database
+"""
+import argparse
+import asyncio
+import contextlib
+import glob
+import json
+import logging
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from sqlalchemy import insert, select
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from benchmarks.startup import BACKEND_DIR, free_port, poll  # noqa: E402
+
+logging.getLogger('httpx').setLevel(logging.WARNING)
+
+# Query strings that make a route do representative work; other routes are requested without any
+ROUTE_PARAMS = {
+    "/api/districts/performance": lambda rng, ids: {"ids": ",".join(rng.sample(ids, min(10, len(ids)))), "months": 6},
+    "/api/districts/{district_id}/history": lambda rng, ids: {"bucket": rng.choice(["month", "quarter", "fin_year"])},
+    "/api/analytics/rankings": lambda rng, ids: {"limit": 10},
+    "/api/metrics/export": lambda rng, ids: {"format": "ndjson", "district": rng.choice(ids)},
+}
+SKIPPED_ROUTES = {
+    "/api/stream/metrics": "server-sent events response never completes",
+}
+
+
+def find_pg_binary(name: str) -> str:
+    candidates = [shutil.which(name)] + sorted(glob.glob(f"/usr/lib/postgresql/*/bin/{name}"), reverse=True)
+    for path in candidates:
+        if path:
+            return path
+    raise SystemExit(f"{name} not found; install Postgres server binaries or pass --database-url")
+
+
+@contextlib.contextmanager
+def throwaway_database(kind: str):
+    """Yield a DATABASE_URL for a fresh database that is deleted afterwards"""
+    with tempfile.TemporaryDirectory(prefix='mgnrega-load-') as tmp:
+        if kind == 'sqlite':
+            yield f"sqlite+aiosqlite:///{tmp}/load_test.db"
+            return
+        # initdb refuses to run as root
+        pg_ctl, data_dir, port = find_pg_binary('pg_ctl'), f"{tmp}/pgdata", free_port()
+        subprocess.run([find_pg_binary('initdb'), '-D', data_dir, '-U', 'postgres', '--auth=trust', '-E', 'UTF8'],
+                       check=True, stdout=subprocess.DEVNULL)
+        subprocess.run([pg_ctl, '-D', data_dir, '-l', f"{tmp}/postgres.log", '-w', 'start', '-o',
+                        f"-p {port} -k {tmp} -c listen_addresses=127.0.0.1 -c fsync=off"],
+                       check=True, stdout=subprocess.DEVNULL)
+        try:
+            yield f"postgresql+asyncpg://postgres@127.0.0.1:{port}/postgres"
+        finally:
+            subprocess.run([pg_ctl, '-D', data_dir, '-m', 'immediate', 'stop'], stdout=subprocess.DEVNULL)
+
+
+async def seed(districts: int, months: int):
+    """Create the schema and load districts x months of synthetic metrics; returns the district ids"""
+    import server
+
+    async with server.engine.begin() as conn:
+        await conn.run_sync(server.create_tables)
+        await server.run_migrations(conn)
+    rows = server.seed_districts(districts)
+    async with server.AsyncSessionLocal() as session:
+        existing = set((await session.execute(select(server.DistrictORM.id))).scalars().all())
+        missing = [r for r in rows if r['id'] not in existing]
+        if missing:
+            await session.execute(insert(server.DistrictORM), missing)
+            await session.commit()
+    district_ids = [r['id'] for r in rows]
+    start = time.perf_counter()
+    loaded = await server.generate_mock_metrics(district_ids, months)
+    logging.info(f"Seeded {loaded:,} metric rows in {time.perf_counter() - start:.1f}s")
+    await server.engine.dispose()
+    return district_ids
+
+
+def api_routes():
+    import server
+
+    paths = sorted({r.path for r in server.app.routes
+                    if r.path.startswith('/api') and 'GET' in getattr(r, 'methods', ())})
+    return [p for p in paths if p not in SKIPPED_ROUTES]
+
+
+async def drive(client, template, district_ids, total, concurrency, rng):
+    """Issue `total` requests to one route from `concurrency` clients; returns latencies and errors"""
+    latencies, errors = [], 0
+
+    def next_request():
+        path = template.replace("{district_id}", rng.choice(district_ids))
+        params = ROUTE_PARAMS.get(template, lambda rng, ids: {})(rng, district_ids)
+        return path, params
+
+    async def client_loop(n):
+        nonlocal errors
+        for _ in range(n):
+            path, params = next_request()
+            start = time.perf_counter()
+            r = await client.get(path, params=params)
+            await r.aread()
+            latencies.append(time.perf_counter() - start)
+            if r.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    share, extra = divmod(total, concurrency)
+    await asyncio.gather(*(client_loop(share + (i < extra)) for i in range(concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+
+async def run_load(base_url, district_ids, requests, concurrency, warmup, seed_value):
+    from server import DbStats
+
+    rng = random.Random(seed_value)
+    routes = {}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        for template in api_routes():
+            if warmup:
+                await drive(client, template, district_ids, warmup, min(warmup, concurrency), rng)
+            latencies, errors, elapsed = await drive(client, template, district_ids, requests, concurrency, rng)
+            routes[f"GET {template}"] = {
+                "requests": len(latencies),
+                "errors": errors,
+                "req_per_s": round(len(latencies) / elapsed, 1),
+                **DbStats.percentiles_ms(latencies),
+            }
+            logging.info(f"GET {template}: {routes[f'GET {template}']}")
+        db = (await client.get("/api/db/stats")).json()
+
+    # Query counts and DB time are per request, including warmup requests
+    for route, stats in routes.items():
+        server_side = db["routes"].get(route, {})
+        stats["queries_per_request"] = server_side.get("queries_per_request")
+        stats["db_ms_per_request"] = server_side.get("db_ms_per_request")
+    return routes
+
+
+def regressions(report: dict, baseline: dict, tolerance: float):
+    found = []
+    for route, stats in report["routes"].items():
+        before = baseline.get("routes", {}).get(route)
+        if before and before.get("p95_ms") and stats.get("p95_ms", 0) > before["p95_ms"] * (1 + tolerance):
+            found.append(f"{route}: p95 {before['p95_ms']}ms -> {stats['p95_ms']}ms")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', choices=['sqlite', 'postgres'], default='sqlite', help="throwaway database to create")
+    parser.add_argument('--database-url', help="use an existing database instead of a throwaway one")
+    parser.add_argument('--districts', type=int, default=30)
+    parser.add_argument('--months', type=int, default=24)
+    parser.add_argument('--requests', type=int, default=500, help="measured requests per route")
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=20, help="unmeasured requests per route first")
+    parser.add_argument('--cold', action='store_true', help="disable the response cache and analytics snapshot reuse")
+    parser.add_argument('--seed', type=int, default=0, help="random seed for request parameters")
+    parser.add_argument('--output', type=Path, help="write the JSON report here instead of stdout")
+    parser.add_argument('--baseline', type=Path, help="earlier report to compare p95 latencies against")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed p95 regression (0.25 = +25%%)")
+    args = parser.parse_args()
+
+    database = contextlib.nullcontext(args.database_url) if args.database_url else throwaway_database(args.db)
+    with database as database_url:
+        # server reads DATABASE_URL at import time, in this process (seeding) and in the uvicorn child
+        os.environ['DATABASE_URL'] = database_url
+        district_ids = asyncio.run(seed(args.districts, args.months))
+
+        env = {**os.environ, "INGEST_INTERVAL_HOURS": "0"}
+        if args.cold:
+            env.update({"RESPONSE_CACHE_TTL": "0", "ANALYTICS_MAX_AGE": "0"})
+        port = free_port()
+        proc = subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'server:app', '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning'],
+            cwd=BACKEND_DIR, env=env,
+        )
+        try:
+            base_url = f"http://127.0.0.1:{port}"
+            poll(f"{base_url}/readyz", time.perf_counter() + 120, proc)
+            routes = asyncio.run(run_load(base_url, district_ids, args.requests, args.concurrency, args.warmup, args.seed))
+        finally:
+            proc.terminate()
+            proc.wait(timeout=10)
+
+    dialect = database_url.split(':', 1)[0].split('+', 1)[0]
+    report = {
+        "config": {
+            "database": dialect, "districts": args.districts, "months": args.months, "requests": args.requests,
+            "concurrency": args.concurrency, "warmup": args.warmup, "cold": args.cold, "seed": args.seed,
+        },
+        "skipped": SKIPPED_ROUTES,
+        "routes": routes,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        if baseline.get("config") != report["config"]:
+            print(f"warning: baseline config differs: {baseline.get('config')}", file=sys.stderr)
+        found = regressions(report, baseline, args.tolerance)
+        for line in found:
+            print(f"regression: {line}", file=sys.stderr)
+        if found:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
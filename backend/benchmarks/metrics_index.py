@@ -0,0 +1,83 @@
+"""Compare query plans and latency for the metrics access pattern with and without the composite index.
+
+Seeds a scratch copy of the metrics table (YEARS x DISTRICTS months) in the database pointed to by
+DATABASE_URL, runs the hot queries, adds the indexes from migration 1 and runs them again.
+
+    python -m benchmarks.metrics_index --districts 1000 --years 10
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from server import DATABASE_URL  # noqa: E402
+
+TABLE = 'bench_metrics'
+
+QUERIES = {
+    "district_latest": f"SELECT * FROM {TABLE} WHERE district_id = :did ORDER BY year DESC, month DESC LIMIT 1",
+    "district_trend": f"SELECT * FROM {TABLE} WHERE district_id = :did ORDER BY year DESC, month DESC LIMIT 6",
+    "latest_per_district": (
+        f"SELECT * FROM (SELECT *, row_number() OVER (PARTITION BY district_id ORDER BY year DESC, month DESC) AS rn "
+        f"FROM {TABLE}) ranked WHERE rn = 1"
+    ),
+}
+
+
+async def seed(conn, districts, years):
+    await conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+    await conn.execute(text(
+        f"CREATE TABLE {TABLE} (id VARCHAR PRIMARY KEY, district_id VARCHAR, year INTEGER, month INTEGER, "
+        "total_job_days FLOAT, target_job_days FLOAT, households_covered INTEGER, wages_paid FLOAT, "
+        "performance_index FLOAT, timestamp TIMESTAMP WITH TIME ZONE)"
+    ))
+    # Insert in random order so the heap is not already clustered by district
+    await conn.execute(text(
+        f"INSERT INTO {TABLE} "
+        "SELECT md5(d::text || '-' || m::text), 'D' || lpad(d::text, 5, '0'), 2000 + m / 12, m % 12 + 1, "
+        "random() * 150000, 100000, (random() * 15000)::int, random() * 3e7, 60 + random() * 50, now() "
+        "FROM generate_series(1, :districts) d, generate_series(0, :months - 1) m ORDER BY random()"
+    ), {"districts": districts, "months": years * 12})
+    await conn.execute(text(f"ANALYZE {TABLE}"))
+
+
+async def measure(conn, label, districts, repeat):
+    print(f"\n=== {label} ===")
+    for name, sql in QUERIES.items():
+        params = {"did": f"D{districts // 2:05d}"}
+        plan = (await conn.execute(text(f"EXPLAIN ANALYZE {sql}"), params)).scalars().all()
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            (await conn.execute(text(sql), params)).fetchall()
+            timings.append((time.perf_counter() - start) * 1000)
+        print(f"\n-- {name}: median {statistics.median(timings):.2f} ms, max {max(timings):.2f} ms")
+        print("\n".join(plan))
+
+
+async def main(districts, years, repeat):
+    engine = create_async_engine(DATABASE_URL)
+    async with engine.begin() as conn:
+        await seed(conn, districts, years)
+        await measure(conn, "before: primary key only", districts, repeat)
+        await conn.execute(text(f"CREATE UNIQUE INDEX ON {TABLE} (district_id, year, month)"))
+        await conn.execute(text(f"CREATE INDEX ON {TABLE} (district_id, year DESC, month DESC)"))
+        await conn.execute(text(f"ANALYZE {TABLE}"))
+        await measure(conn, "after: composite indexes", districts, repeat)
+        await conn.execute(text(f"DROP TABLE {TABLE}"))
+    await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--districts', type=int, default=1000)
+    parser.add_argument('--years', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.districts, args.years, args.repeat))
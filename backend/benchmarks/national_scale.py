@@ -0,0 +1,180 @@
+"""Per-state dashboard latency as the database grows from one state to the whole country.
+
+Loads synthetic districts and metrics state by state into a throwaway database (or --database-url) and,
+after each step, times Karnataka's dashboard routes in-process through httpx's ASGI transport with the
+response cache and analytics snapshot reuse disabled, so every request does its database work. Because
+those routes are scoped to one state and (on Postgres) metrics are partitioned by year, their latency
+should stay flat as other states' rows pile up. On Postgres the report also counts the year partitions
+the per-state queries scan. Exits non-zero if a route's median latency grows by more than --max-slowdown.
+
+    python -m benchmarks.national_scale --districts-per-state 21 --months 180 --steps 1,6,12,36
+    python -m benchmarks.national_scale --db postgres --months 180       # throwaway local Postgres
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+from sqlalchemy import insert, select, text
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from benchmarks.load_test import throwaway_database  # noqa: E402
+
+logging.getLogger('httpx').setLevel(logging.WARNING)
+
+# Karnataka first, so it is the only state in the first step
+STATES = [
+    "KA", "AP", "AR", "AS", "BR", "CG", "GA", "GJ", "HR", "HP", "JH", "KL", "MP", "MH", "MN", "ML", "MZ", "NL",
+    "OD", "PB", "RJ", "SK", "TN", "TS", "TR", "UP", "UK", "WB", "AN", "CH", "DN", "DL", "JK", "LA", "LD", "PY",
+]
+STATE = "KA"
+
+
+def dashboard_routes():
+    year = datetime.now(timezone.utc).year
+    return {
+        "/api/metrics/state": {"state": STATE},
+        "/api/metrics/state/yoy": {"state": STATE},
+        "/api/metrics/comparison": {"state": STATE},
+        "/api/analytics/summary": {"state": STATE},
+        "/api/districts/performance": {"state": STATE, "months": 6},
+        f"/api/districts/{STATE}01/history": {"from": f"{year - 1}-01", "to": f"{year}-12"},
+    }
+
+
+async def load_state(state: str, districts: int, months: int) -> int:
+    import server
+
+    rows = server.seed_districts(districts, state)
+    async with server.AsyncSessionLocal() as session:
+        await session.execute(insert(server.DistrictORM), rows)
+        await session.commit()
+    return await server.generate_mock_metrics([r['id'] for r in rows], months)
+
+
+async def time_routes(client, requests: int) -> dict:
+    from server import DbStats
+
+    report = {}
+    for path, params in dashboard_routes().items():
+        latencies = []
+        for i in range(requests + 1):
+            start = time.perf_counter()
+            r = await client.get(path, params=params)
+            if r.status_code != 200:
+                raise RuntimeError(f"GET {path} returned {r.status_code}: {r.text[:200]}")
+            # The first request warms connections and the statement cache
+            if i:
+                latencies.append(time.perf_counter() - start)
+        report[path] = DbStats.percentiles_ms(latencies)
+    return report
+
+
+def scanned_relations(plan) -> list:
+    if isinstance(plan, list):
+        return [name for node in plan for name in scanned_relations(node)]
+    if not isinstance(plan, dict):
+        return []
+    names = [plan["Relation Name"]] if "Relation Name" in plan else []
+    return names + [name for child in plan.values() for name in scanned_relations(child)]
+
+
+async def partitions_scanned() -> dict:
+    """Year partitions Postgres plans to read for the analytics window and a two-year history query"""
+    import server
+    from server import MetricORM
+
+    year = datetime.now(timezone.utc).year
+    async with server.engine.connect() as conn:
+        start_year = await server.analytics_start_year(conn, STATE)
+        queries = {
+            "analytics_window": select(MetricORM.id).where(MetricORM.state == STATE, MetricORM.year >= start_year),
+            "history": select(MetricORM.id).where(
+                MetricORM.district_id == f"{STATE}01", *server.period_conditions((year - 1, 1), (year, 12))),
+        }
+        report = {"total": len((await conn.execute(text(
+            "SELECT inhrelid FROM pg_inherits WHERE inhparent = 'metrics'::regclass"))).all())}
+        for name, stmt in queries.items():
+            sql = str(stmt.compile(conn.sync_connection, compile_kwargs={"literal_binds": True}))
+            plan = (await conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"))).scalar()
+            plan = json.loads(plan) if isinstance(plan, str) else plan
+            report[name] = len({n for n in scanned_relations(plan) if n.startswith('metrics_y')})
+    return report
+
+
+async def run(steps, districts: int, months: int, requests: int):
+    import server
+
+    async with server.engine.begin() as conn:
+        await conn.run_sync(server.create_tables)
+        await server.run_migrations(conn)
+        await server.detect_data_access(conn)
+    # No lifespan under the ASGI transport, so nothing bootstraps or seeds Karnataka behind our back
+    server.readiness.mark_ready()
+
+    results, loaded, metric_rows = [], 0, 0
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://bench",
+                                 timeout=120) as client:
+        for target in steps:
+            start = time.perf_counter()
+            for state in STATES[loaded:target]:
+                metric_rows += await load_state(state, districts, months)
+            loaded = target
+            logging.info(f"{loaded} states, {metric_rows:,} metric rows (+{time.perf_counter() - start:.1f}s to load)")
+            step = {"states": loaded, "metric_rows": metric_rows, "routes": await time_routes(client, requests)}
+            if server.engine.dialect.name == 'postgresql':
+                step["partitions_scanned"] = await partitions_scanned()
+            results.append(step)
+    await server.engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', choices=['sqlite', 'postgres'], default='sqlite', help="throwaway database to create")
+    parser.add_argument('--database-url', help="use an existing, empty database instead of a throwaway one")
+    parser.add_argument('--districts-per-state', type=int, default=21)
+    parser.add_argument('--months', type=int, default=180, help="history per district")
+    parser.add_argument('--steps', default="1,6,12,36", help="comma-separated cumulative state counts to measure at")
+    parser.add_argument('--requests', type=int, default=50, help="measured requests per route and step")
+    parser.add_argument('--max-slowdown', type=float, default=None,
+                        help="fail if a route's median at the last step exceeds the first step's by this factor")
+    args = parser.parse_args()
+    steps = sorted({min(int(s), len(STATES)) for s in args.steps.split(',')})
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    database = contextlib.nullcontext(args.database_url) if args.database_url else throwaway_database(args.db)
+    with database as database_url:
+        # server reads these at import time; no caching means every request hits the database
+        os.environ.update({"DATABASE_URL": database_url, "RESPONSE_CACHE_TTL": "0", "ANALYTICS_MAX_AGE": "0"})
+        results = asyncio.run(run(steps, args.districts_per_state, args.months, args.requests))
+
+    first, last = results[0]["routes"], results[-1]["routes"]
+    slowdown = {path: round(last[path]["p50_ms"] / first[path]["p50_ms"], 2) if first[path]["p50_ms"] else None
+                for path in first}
+    report = {
+        "config": {
+            "database": database_url.split(':', 1)[0].split('+', 1)[0], "districts_per_state": args.districts_per_state,
+            "months": args.months, "requests": args.requests, "state": STATE,
+        },
+        "steps": results,
+        "p50_slowdown": slowdown,
+    }
+    print(json.dumps(report, indent=2))
+    if args.max_slowdown is not None:
+        slow = {path: ratio for path, ratio in slowdown.items() if ratio and ratio > args.max_slowdown}
+        for path, ratio in slow.items():
+            print(f"{path}: median {ratio}x slower with {results[-1]['states']} states", file=sys.stderr)
+        if slow:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
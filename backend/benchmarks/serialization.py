@@ -0,0 +1,102 @@
+"""Requests/second for the district list and bulk performance payloads, before and after pre-encoding.
+
+"before" serves each payload the way the routes used to: response_model validation, jsonable_encoder
+and json.dumps on every request. "after" serves a cached EncodedPayload, with and without gzip.
+Everything runs in-process through httpx's ASGI transport with no database, so the numbers isolate
+serialization and framework cost (after_gzip also includes httpx decompressing on the client side).
+
+    python -m benchmarks.serialization --requests 5000 --months 6
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+import httpx
+from fastapi import FastAPI, Request
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from payloads import EncodedPayload  # noqa: E402
+from server import (KARNATAKA_DISTRICTS, District,  # noqa: E402
+                    DistrictPerformance, district_performance,
+                    mock_metric_rows)
+
+logging.getLogger('httpx').setLevel(logging.WARNING)
+
+
+def build_payloads(months: int):
+    districts = [{**d, "coordinates": [15.3173, 75.7139]} for d in KARNATAKA_DISTRICTS]
+    trends = {}
+    for row in mock_metric_rows([d["id"] for d in districts], months):
+        trends.setdefault(row["district_id"], []).append(
+            {**row, "total_job_days": float(row["total_job_days"]), "target_job_days": float(row["target_job_days"])})
+    performance = [district_performance(d, trends.get(d["id"], [])) for d in districts]
+    return districts, performance
+
+
+def bench_app(districts, performance) -> FastAPI:
+    app = FastAPI()
+    encoded = {"districts": EncodedPayload(districts), "performance": EncodedPayload(performance)}
+
+    @app.get("/before/districts", response_model=List[District])
+    async def before_districts():
+        return districts
+
+    @app.get("/before/performance", response_model=List[DistrictPerformance])
+    async def before_performance():
+        return performance
+
+    @app.get("/after/{name}")
+    async def after(name: str, request: Request):
+        return encoded[name].response(request)
+
+    return app
+
+
+async def measure(client, path, total, concurrency, headers):
+    async def worker(n):
+        size = 0
+        for _ in range(n):
+            r = await client.get(path, headers=headers)
+            size = len(r.content)
+        return size
+
+    start = time.perf_counter()
+    sizes = await asyncio.gather(*(worker(total // concurrency) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    # Wire size: re-read compressed length, since httpx decodes Content-Encoding transparently
+    raw = await client.get(path, headers=headers)
+    return {
+        "req_per_s": round(total // concurrency * concurrency / elapsed, 1),
+        "body_bytes": sizes[0],
+        "wire_bytes": int(raw.headers.get('content-length', sizes[0])),
+    }
+
+
+async def main(total, concurrency, months):
+    app = bench_app(*build_payloads(months))
+    transport = httpx.ASGITransport(app=app)
+    report = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name in ("districts", "performance"):
+            report[name] = {
+                "before": await measure(client, f"/before/{name}", total, concurrency, {"Accept-Encoding": "identity"}),
+                "after": await measure(client, f"/after/{name}", total, concurrency, {"Accept-Encoding": "identity"}),
+                "after_gzip": await measure(client, f"/after/{name}", total, concurrency, {"Accept-Encoding": "gzip"}),
+            }
+            before, after = report[name]["before"]["req_per_s"], report[name]["after"]["req_per_s"]
+            report[name]["speedup"] = round(after / before, 2) if before else None
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--months', type=int, default=6, help="trend length per district in the performance payload")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.months))
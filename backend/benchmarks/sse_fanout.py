@@ -0,0 +1,84 @@
+"""Load test for the SSE broadcaster with thousands of simulated local subscribers.
+
+No database or HTTP is involved: a synthetic view of --districts districts changes on every update,
+--subscribers consumers drain their queues (a --slow-fraction of them never read) and the broadcaster
+publishes --updates diffs. Reports fan-out time per update, deliveries, dropped slow subscribers and
+the Python heap peak, which should stay bounded by queue size rather than by update count.
+
+    python -m benchmarks.sse_fanout --subscribers 5000 --updates 200
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from push import MetricsBroadcaster  # noqa: E402
+
+
+async def main(subscribers, updates, districts, slow_fraction, changed_per_update):
+    view = {f"D{i:04d}": {"performance_index": 80.0, "total_job_days": 100000.0} for i in range(districts)}
+    computations = 0
+
+    async def compute():
+        nonlocal computations
+        computations += 1
+        for did in random.sample(list(view), changed_per_update):
+            view[did] = {**view[did], "performance_index": round(random.uniform(50, 110), 2)}
+        return dict(view), {"avg_performance": statistics.mean(v["performance_index"] for v in view.values())}
+
+    broadcaster = MetricsBroadcaster(compute, debounce=0)
+    await broadcaster.snapshot_message()
+    delivered = 0
+
+    async def consume(subscriber):
+        nonlocal delivered
+        while await subscriber.queue.get() is not None:
+            delivered += 1
+
+    tracemalloc.start()
+    slow = int(subscribers * slow_fraction)
+    subs = [broadcaster.subscribe() for _ in range(subscribers)]
+    consumers = [asyncio.create_task(consume(s)) for s in subs[slow:]]
+
+    fanout_times = []
+    for _ in range(updates):
+        message = await broadcaster._refresh()
+        start = time.perf_counter()
+        broadcaster.publish(message)
+        fanout_times.append(time.perf_counter() - start)
+        await asyncio.sleep(0)  # let consumers run
+
+    await asyncio.sleep(0.1)
+    peak = tracemalloc.get_traced_memory()[1]
+    dropped = broadcaster.dropped
+    await broadcaster.stop()
+    await asyncio.gather(*consumers, return_exceptions=True)
+
+    fanout_times.sort()
+    print({
+        "subscribers": subscribers,
+        "slow_subscribers": slow,
+        "updates": updates,
+        "view_computations": computations,
+        "fanout_p50_ms": round(fanout_times[len(fanout_times) // 2] * 1000, 2),
+        "fanout_max_ms": round(fanout_times[-1] * 1000, 2),
+        "delivered": delivered,
+        "dropped_subscribers": dropped,
+        "heap_peak_mb": round(peak / 1024 / 1024, 1),
+    })
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--subscribers', type=int, default=5000)
+    parser.add_argument('--updates', type=int, default=200)
+    parser.add_argument('--districts', type=int, default=750)
+    parser.add_argument('--slow-fraction', type=float, default=0.1)
+    parser.add_argument('--changed-per-update', type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.subscribers, args.updates, args.districts, args.slow_fraction, args.changed_per_update))
@@ -0,0 +1,90 @@
+"""Measure cold-start latency: process spawn to first byte on /healthz, and to 200 on /readyz.
+
+Each run starts a fresh `uvicorn server:app` against DATABASE_URL and polls until it answers. The
+time to first byte should not depend on the database: bootstrap and seeding happen in the background
+and only delay readiness. Also reports the bare `import server` time in a fresh interpreter. Exits
+non-zero if the median time to first byte exceeds --max-first-byte.
+
+    python -m benchmarks.startup --runs 5 [--max-first-byte 3.0]
+"""
+import argparse
+import json
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def poll(url: str, deadline: float, proc: subprocess.Popen) -> float:
+    """Poll url until it returns 200; returns the time of that response"""
+    while time.perf_counter() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited with code {proc.returncode}")
+        try:
+            with urllib.request.urlopen(url, timeout=1) as r:
+                if r.status == 200:
+                    return time.perf_counter()
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.01)
+    raise TimeoutError(f"{url} did not return 200 in time")
+
+
+def import_time() -> float:
+    code = "import time; t = time.perf_counter(); import server; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, '-c', code], cwd=BACKEND_DIR, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def one_run(timeout: float) -> dict:
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'server:app', '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning'],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = start + timeout
+        first_byte = poll(f"{base}/healthz", deadline, proc) - start
+        ready = poll(f"{base}/readyz", deadline, proc) - start
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+    return {"first_byte_s": round(first_byte, 3), "ready_s": round(ready, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--timeout', type=float, default=120.0, help="seconds to wait for readiness per run")
+    parser.add_argument('--max-first-byte', type=float, default=None, help="fail if the median first byte is slower (s)")
+    args = parser.parse_args()
+
+    runs = [one_run(args.timeout) for _ in range(args.runs)]
+    report = {
+        "import_server_s": round(statistics.median(import_time() for _ in range(args.runs)), 3),
+        "first_byte_s": statistics.median(r["first_byte_s"] for r in runs),
+        "ready_s": statistics.median(r["ready_s"] for r in runs),
+        "runs": runs,
+    }
+    print(json.dumps(report, indent=2))
+    if args.max_first_byte is not None and report["first_byte_s"] > args.max_first_byte:
+        print(f"median first byte {report['first_byte_s']}s exceeds {args.max_first_byte}s", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+"""Bulk loading of metrics rows without building ORM objects.
+
+Each row's state is copied from its district, and on Postgres the year partitions a batch needs are
+created before it is written.
+
+On Postgres each batch is streamed with asyncpg's COPY into a per-connection staging table and merged
+into metrics with one INSERT .. ON CONFLICT (district_id, year, month) DO UPDATE. Other dialects
+(SQLite for local runs) fall back to a batched executemany upsert. Rollups for the touched months and
+districts are refreshed in the same transaction as each batch.
+
+    python bulk_load.py load-metrics metrics.csv [--batch-size 50000]
+"""
+import argparse
+import asyncio
+import csv
+import itertools
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from sqlalchemy import select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from server import (DistrictORM, MetricORM, disable_statement_timeout, engine,
+                    metric_partitions, on_metrics_written, refresh_rollups)
+
+logger = logging.getLogger(__name__)
+
+BULK_LOAD_BATCH_SIZE = int(os.environ.get('BULK_LOAD_BATCH_SIZE', '50000'))
+
+METRIC_COLUMNS = [c.name for c in MetricORM.__table__.columns]
+CONFLICT_COLUMNS = ['district_id', 'year', 'month']
+UPDATE_COLUMNS = [c for c in METRIC_COLUMNS if c not in ('id', *CONFLICT_COLUMNS)]
+
+STAGING_TABLE = 'metrics_staging'
+# Rows vanish at each commit, so the table can be reused batch after batch on the same connection
+STAGING_DDL = f"CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} (LIKE metrics INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+MERGE_SQL = (
+    f"INSERT INTO metrics ({', '.join(METRIC_COLUMNS)}) "
+    f"SELECT DISTINCT ON ({', '.join(CONFLICT_COLUMNS)}) {', '.join(METRIC_COLUMNS)} FROM {STAGING_TABLE} "
+    f"ORDER BY {', '.join(CONFLICT_COLUMNS)}, timestamp DESC "
+    f"ON CONFLICT ({', '.join(CONFLICT_COLUMNS)}) DO UPDATE SET "
+    + ', '.join(f"{c} = EXCLUDED.{c}" for c in UPDATE_COLUMNS)
+)
+
+
+def prepare_row(row: dict, now: datetime, state: Optional[str] = None) -> dict:
+    """Coerce a loosely typed row (e.g. from CSV) to metrics column types, filling id/timestamp/performance/state"""
+    total_job_days = float(row['total_job_days'] or 0)
+    target_job_days = float(row['target_job_days'] or 0)
+    performance = row.get('performance_index')
+    if performance in (None, ''):
+        performance = round(total_job_days / target_job_days * 100, 2) if target_job_days else 0.0
+    timestamp = row.get('timestamp') or now
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    return {
+        **{k: v for k, v in row.items() if k in METRIC_COLUMNS},
+        "id": row.get('id') or str(uuid.uuid4()),
+        "district_id": row['district_id'],
+        "state": row.get('state') or state,
+        "year": int(row['year']),
+        "month": int(row['month']),
+        "total_job_days": total_job_days,
+        "target_job_days": target_job_days,
+        "households_covered": int(float(row['households_covered'] or 0)),
+        "wages_paid": float(row['wages_paid'] or 0),
+        "performance_index": float(performance),
+        "timestamp": timestamp,
+    }
+
+
+def upsert_statement():
+    insert = pg_insert if engine.dialect.name == 'postgresql' else sqlite_insert
+    stmt = insert(MetricORM)
+    updated = {c: stmt.excluded[c] for c in UPDATE_COLUMNS}
+    return stmt.on_conflict_do_update(index_elements=CONFLICT_COLUMNS, set_=updated)
+
+
+def batched(rows: Iterable[dict], size: int) -> Iterator[List[dict]]:
+    iterator = iter(rows)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+async def _copy_batch(conn, batch: List[dict]):
+    # The asyncpg adapter only opens its transaction on a cursor execute, and COPY through the raw
+    # connection is not one: run a real statement first, or the COPY autocommits and ON COMMIT DELETE
+    # ROWS empties the staging table before the merge sees it
+    await conn.execute(text(f"TRUNCATE {STAGING_TABLE}"))
+    raw = await conn.get_raw_connection()
+    records = [tuple(row.get(c) for c in METRIC_COLUMNS) for row in batch]
+    await raw.driver_connection.copy_records_to_table(STAGING_TABLE, records=records, columns=METRIC_COLUMNS)
+    await conn.execute(text(MERGE_SQL))
+
+
+async def _executemany_batch(conn, batch: List[dict]):
+    # A single upsert statement may not touch the same key twice, so keep the newest row per month
+    unique: Dict[tuple, dict] = {}
+    for row in sorted(batch, key=lambda r: r['timestamp']):
+        unique[tuple(row[c] for c in CONFLICT_COLUMNS)] = row
+    await conn.execute(upsert_statement(), list(unique.values()))
+
+
+async def load_metric_rows(rows: Iterable[dict], batch_size: int = BULK_LOAD_BATCH_SIZE) -> int:
+    """Upsert rows into metrics in batches, committing each batch; returns the number of input rows loaded"""
+    now = datetime.now(timezone.utc)
+    use_copy = engine.dialect.name == 'postgresql'
+    loaded = 0
+    written_states = set()
+    district_states: Dict[str, Optional[str]] = {}
+    async with engine.connect() as conn:
+        if use_copy:
+            await conn.execute(text(STAGING_DDL))
+            await conn.commit()
+        for batch in batched(rows, batch_size):
+            await metric_partitions.ensure(conn, {int(row['year']) for row in batch})
+            # A full batch and its rollup refresh can outlast the per-request timeout; ensure() may have
+            # committed, so this is set again for each batch's transaction
+            await disable_statement_timeout(conn)
+            unknown = {row['district_id'] for row in batch} - district_states.keys()
+            if unknown:
+                found = dict((await conn.execute(
+                    select(DistrictORM.id, DistrictORM.state).where(DistrictORM.id.in_(unknown))
+                )).all())
+                district_states.update({district_id: found.get(district_id) for district_id in unknown})
+            batch = [prepare_row(row, now, district_states[row['district_id']]) for row in batch]
+            if use_copy:
+                await _copy_batch(conn, batch)
+            else:
+                await _executemany_batch(conn, batch)
+            await refresh_rollups(
+                conn,
+                periods={(row['year'], row['month']) for row in batch},
+                district_ids={row['district_id'] for row in batch},
+            )
+            await conn.commit()
+            loaded += len(batch)
+            written_states.update(row['state'] for row in batch)
+    if loaded:
+        on_metrics_written(written_states)
+    return loaded
+
+
+async def load_metrics_csv(path: Path, batch_size: int = BULK_LOAD_BATCH_SIZE) -> int:
+    """Stream a CSV with metrics column headers into the metrics table"""
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        loaded = 0
+        # File reads happen in a worker thread so a load triggered inside the server doesn't stall requests
+        while batch := await asyncio.to_thread(lambda: list(itertools.islice(reader, batch_size))):
+            loaded += await load_metric_rows(batch, batch_size)
+    return loaded
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Bulk metrics loader")
+    commands = parser.add_subparsers(dest='command', required=True)
+    load_cmd = commands.add_parser('load-metrics', help="load a CSV with metrics column headers")
+    load_cmd.add_argument('path', type=Path)
+    load_cmd.add_argument('--batch-size', type=int, default=BULK_LOAD_BATCH_SIZE)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    count = asyncio.run(load_metrics_csv(args.path, args.batch_size))
+    elapsed = time.perf_counter() - start
+    logger.info(f"Loaded {count} rows in {elapsed:.1f}s ({count / elapsed:,.0f} rows/s)")
@@ -0,0 +1,228 @@
+"""Background ingestion of MGNREGA district data from data.gov.in into the metrics table.
+
+Pages are fetched with a shared async HTTP connection pool, bounded concurrency, a request-rate
+limit and retry/backoff, normalised into metrics rows and written through the bulk loader's batched
+upserts on (district_id, year, month).
+
+    python ingest.py run [--base-url URL] [--record DIR]    # one ingest pass
+    python ingest.py replay DIR [--port 9000]               # serve recorded pages offline
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import httpx
+
+from bulk_load import load_metric_rows
+from server import KARNATAKA_DISTRICTS, MGNREGA_API_KEY, MGNREGA_BASE_URL
+
+logger = logging.getLogger(__name__)
+# httpx logs full request URLs at INFO, which would include the api-key query parameter
+logging.getLogger('httpx').setLevel(logging.WARNING)
+
+# District-wise MGNREGA Data at a Glance
+MGNREGA_RESOURCE_ID = os.environ.get('MGNREGA_RESOURCE_ID', 'ee03643a-ee4c-48c2-ac30-9f2ff26ab722')
+MGNREGA_STATE = os.environ.get('MGNREGA_STATE', 'KARNATAKA')
+INGEST_PAGE_SIZE = int(os.environ.get('INGEST_PAGE_SIZE', '500'))
+INGEST_CONCURRENCY = int(os.environ.get('INGEST_CONCURRENCY', '4'))
+INGEST_RATE_LIMIT = float(os.environ.get('INGEST_RATE_LIMIT', '2'))  # requests per second
+INGEST_MAX_RETRIES = int(os.environ.get('INGEST_MAX_RETRIES', '5'))
+INGEST_BATCH_SIZE = int(os.environ.get('INGEST_BATCH_SIZE', '1000'))
+
+MONTHS = {name: i for i, name in enumerate(
+    ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'], start=1)}
+
+# Current official spellings used by the data.gov.in resource
+DISTRICT_ALIASES = {
+    "BELAGAVI": "Belgaum", "BALLARI": "Bellary", "BENGALURU": "Bangalore Urban",
+    "BENGALURU URBAN": "Bangalore Urban", "BENGALURU RURAL": "Bangalore Rural",
+    "KALABURAGI": "Gulbarga", "MYSURU": "Mysore", "SHIVAMOGGA": "Shimoga", "TUMAKURU": "Tumkur",
+    "CHIKKAMAGALURU": "Chikkamagaluru", "CHIKMAGALUR": "Chikkamagaluru", "BIJAPUR": "Vijayapura",
+    "CHAMARAJA NAGARA": "Chamarajanagar", "DAVANGERE": "Davanagere", "BAGALKOTE": "Bagalkot",
+}
+DISTRICT_IDS = {d['name_en'].upper(): d['id'] for d in KARNATAKA_DISTRICTS}
+DISTRICT_IDS.update({alias: DISTRICT_IDS[name.upper()] for alias, name in DISTRICT_ALIASES.items()})
+
+
+class RetryableStatus(Exception):
+    def __init__(self, response: httpx.Response):
+        super().__init__(f"HTTP {response.status_code}")
+        self.response = response
+
+
+class RateLimiter:
+    """Spaces request starts at least 1/rate seconds apart across all workers"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def normalize_record(record: dict) -> Optional[dict]:
+    """Map one data.gov.in record to a metrics row, or None if it can't be placed"""
+    district_id = DISTRICT_IDS.get(str(record.get('district_name', '')).strip().upper())
+    month = MONTHS.get(str(record.get('month', '')).strip()[:3].lower())
+    first_year, dash, _ = str(record.get('fin_year', '')).strip().partition('-')
+    if not district_id or not month or not dash or not first_year.isdecimal():
+        return None
+    # Financial year runs April-March: "2024-2025" + "Jan" is January 2025
+    start_year = int(first_year)
+    year = start_year if month >= 4 else start_year + 1
+
+    def number(key):
+        try:
+            return float(record.get(key) or 0)
+        except (TypeError, ValueError):
+            return 0.0
+
+    job_days = number('Persondays_of_Central_Liability_so_far')
+    target = number('Approved_Labour_Budget')
+    return {
+        "district_id": district_id,
+        "year": year,
+        "month": month,
+        "total_job_days": job_days,
+        "target_job_days": target,
+        "households_covered": int(number('Total_Households_Worked')),
+        "wages_paid": number('Wages'),
+        "performance_index": round(job_days / target * 100, 2) if target else 0.0,
+    }
+
+
+async def fetch_page(client: httpx.AsyncClient, limiter: RateLimiter, offset: int, limit: int,
+                     record_dir: Optional[Path] = None) -> dict:
+    params = {
+        "api-key": MGNREGA_API_KEY,
+        "format": "json",
+        "offset": offset,
+        "limit": limit,
+        "filters[state_name]": MGNREGA_STATE,
+    }
+    for attempt in range(1, INGEST_MAX_RETRIES + 1):
+        await limiter.wait()
+        try:
+            response = await client.get(f"/{MGNREGA_RESOURCE_ID}", params=params)
+            if response.status_code == 429 or response.status_code >= 500:
+                raise RetryableStatus(response)
+            response.raise_for_status()
+            page = response.json()
+            break
+        except (httpx.TransportError, RetryableStatus) as e:
+            if attempt == INGEST_MAX_RETRIES:
+                raise
+            retry_after = e.response.headers.get('Retry-After') if isinstance(e, RetryableStatus) else None
+            delay = float(retry_after) if retry_after and retry_after.isdigit() else 2 ** (attempt - 1)
+            delay += random.uniform(0, delay / 2)
+            logger.warning(f"Ingest page offset={offset} failed ({e}); retry {attempt} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    if record_dir is not None:
+        (record_dir / f"offset_{offset:08d}.json").write_text(json.dumps(page))
+    return page
+
+
+async def write_batch(rows: List[dict]) -> int:
+    return await load_metric_rows(rows, INGEST_BATCH_SIZE) if rows else 0
+
+
+async def ingest(base_url: str = MGNREGA_BASE_URL, transport: Optional[httpx.AsyncBaseTransport] = None,
+                 record_dir: Optional[Path] = None) -> int:
+    """Run one full ingest pass and return the number of rows upserted"""
+    if record_dir is not None:
+        record_dir.mkdir(parents=True, exist_ok=True)
+    limits = httpx.Limits(max_connections=INGEST_CONCURRENCY, max_keepalive_connections=INGEST_CONCURRENCY)
+    limiter = RateLimiter(INGEST_RATE_LIMIT)
+    pending: List[dict] = []
+    written = 0
+    offsets: List[int] = []
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, transport=transport,
+                                 timeout=httpx.Timeout(30.0)) as client:
+        first = await fetch_page(client, limiter, 0, INGEST_PAGE_SIZE, record_dir)
+        total = int(first.get('total') or 0)
+        offsets = list(range(INGEST_PAGE_SIZE, total, INGEST_PAGE_SIZE))
+        semaphore = asyncio.Semaphore(INGEST_CONCURRENCY)
+
+        async def bounded(offset):
+            async with semaphore:
+                return await fetch_page(client, limiter, offset, INGEST_PAGE_SIZE, record_dir)
+
+        async def consume(page):
+            nonlocal pending, written
+            pending.extend(row for row in map(normalize_record, page.get('records') or []) if row)
+            if len(pending) >= INGEST_BATCH_SIZE:
+                written += await write_batch(pending)
+                pending = []
+
+        tasks = [asyncio.create_task(bounded(offset)) for offset in offsets]
+        try:
+            await consume(first)
+            for next_page in asyncio.as_completed(tasks):
+                await consume(await next_page)
+            written += await write_batch(pending)
+        finally:
+            for t in tasks:
+                t.cancel()
+
+    logger.info(f"Ingested {written} metric rows from {1 + len(offsets)} pages")
+    return written
+
+
+async def run_periodic_ingest(interval_seconds: float):
+    """Ingest forever on a fixed interval; failures are logged and retried next round"""
+    while True:
+        try:
+            await ingest()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Ingest failed: {e}")
+        await asyncio.sleep(interval_seconds)
+
+
+def replay_app(pages_dir: Path):
+    """ASGI stand-in for data.gov.in that serves pages recorded with `ingest.py run --record`"""
+    from fastapi import FastAPI, Query
+
+    stand_in = FastAPI()
+    pages = {int(p.stem.split('_')[1]): json.loads(p.read_text()) for p in sorted(pages_dir.glob('offset_*.json'))}
+
+    @stand_in.get("/{resource_id}")
+    async def resource(resource_id: str, offset: int = 0, limit: int = Query(INGEST_PAGE_SIZE)):
+        return pages.get(offset, {"total": pages.get(0, {}).get('total', 0), "offset": offset, "records": []})
+
+    return stand_in
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="MGNREGA data.gov.in ingestion")
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_cmd = commands.add_parser('run', help="run one ingest pass")
+    run_cmd.add_argument('--base-url', default=MGNREGA_BASE_URL)
+    run_cmd.add_argument('--record', type=Path, help="save fetched pages to this directory")
+    replay_cmd = commands.add_parser('replay', help="serve recorded pages as a local stand-in")
+    replay_cmd.add_argument('pages_dir', type=Path)
+    replay_cmd.add_argument('--port', type=int, default=9000)
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        asyncio.run(ingest(args.base_url, record_dir=args.record))
+    else:
+        import uvicorn
+        uvicorn.run(replay_app(args.pages_dir), host='127.0.0.1', port=args.port)
@@ -0,0 +1,97 @@
+"""Pre-encoded JSON response bodies.
+
+Cached route results are serialized once with orjson and kept as bytes, together with gzip and (when
+the brotli package is installed) brotli variants built the first time a client accepts them. Serving
+a cache hit is then a dict lookup and a Response: no response_model validation, no JSON encoding and
+no compression on the request path.
+"""
+import gzip
+import importlib.util
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Optional, Set
+
+import orjson
+from starlette.requests import Request
+from starlette.responses import Response
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 6
+# Smaller bodies gain less from compression than they pay in CPU and headers
+MIN_COMPRESS_SIZE = 500
+BROTLI_AVAILABLE = importlib.util.find_spec('brotli') is not None
+# Z suffix for UTC datetimes, as pydantic's serializer writes them
+ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(value):
+    # asyncpg returns NUMERIC aggregates as Decimal
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(content) -> bytes:
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+def isoformat(value: datetime) -> str:
+    """A datetime as dumps writes it, for non-JSON bodies such as CSV"""
+    return orjson.dumps(value, option=ORJSON_OPTIONS)[1:-1].decode()
+
+
+def accepted_encodings(accept_encoding: str) -> Set[str]:
+    """Codings listed in an Accept-Encoding header, minus any refused with q=0"""
+    accepted = set()
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        q = params.strip()
+        if q.startswith('q='):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name.strip().lower())
+    if '*' in accepted:
+        accepted |= {'br', 'gzip'}
+    return accepted
+
+
+class EncodedPayload:
+    """A JSON body encoded once, plus lazily built compressed variants of it"""
+
+    media_type = "application/json"
+
+    def __init__(self, content):
+        self.body = dumps(content)
+        self._compressed: Dict[str, bytes] = {}
+
+    def encoding_for(self, accept_encoding: Optional[str]) -> Optional[str]:
+        if not accept_encoding or len(self.body) < MIN_COMPRESS_SIZE:
+            return None
+        accepted = accepted_encodings(accept_encoding)
+        if BROTLI_AVAILABLE and 'br' in accepted:
+            return 'br'
+        if 'gzip' in accepted:
+            return 'gzip'
+        return None
+
+    def compressed(self, encoding: str) -> bytes:
+        body = self._compressed.get(encoding)
+        if body is None:
+            if encoding == 'br':
+                import brotli
+                body = brotli.compress(self.body, quality=BROTLI_QUALITY)
+            else:
+                body = gzip.compress(self.body, compresslevel=GZIP_LEVEL, mtime=0)
+            self._compressed[encoding] = body
+        return body
+
+    def response(self, request: Request) -> Response:
+        headers = {"Vary": "Accept-Encoding"}
+        encoding = self.encoding_for(request.headers.get('accept-encoding'))
+        if encoding is None:
+            return Response(self.body, media_type=self.media_type, headers=headers)
+        headers["Content-Encoding"] = encoding
+        return Response(self.compressed(encoding), media_type=self.media_type, headers=headers)
@@ -0,0 +1,141 @@
+"""Server-Sent Events fan-out of metric updates.
+
+One broadcaster task per process waits for metric writes, computes the new district/state view once,
+diffs it against the last published view and hands the same encoded bytes to every subscriber.
+Subscriber queues are bounded: a client that falls behind has its backlog replaced by a single full
+snapshot, and is disconnected if it keeps falling behind.
+"""
+import asyncio
+import json
+import logging
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def sse_message(event: str, version: int, payload: dict) -> bytes:
+    data = json.dumps(payload, separators=(',', ':'), ensure_ascii=False, default=str)
+    return f"event: {event}\nid: {version}\ndata: {data}\n\n".encode()
+
+
+class Subscriber:
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.overflows = 0
+        self.closed = False
+
+
+class MetricsBroadcaster:
+    """Publishes compact diffs of {district_id: values} and state totals to SSE subscribers"""
+
+    def __init__(self, compute: Callable[[], Awaitable[Tuple[Dict[str, dict], dict]]],
+                 queue_size: int = 16, max_overflows: int = 3, debounce: float = 0.5):
+        self.compute = compute
+        self.queue_size = queue_size
+        self.max_overflows = max_overflows
+        self.debounce = debounce
+        self.subscribers: Set[Subscriber] = set()
+        self.version = 0
+        self.districts: Dict[str, dict] = {}
+        self.state: dict = {}
+        self._snapshot_message: Optional[bytes] = None
+        self._changed = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.published = 0
+        self.dropped = 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for subscriber in list(self.subscribers):
+            self._close(subscriber)
+
+    def notify(self):
+        """Signal that metrics changed; safe to call from any coroutine on the serving loop"""
+        self._changed.set()
+
+    async def snapshot_message(self) -> bytes:
+        if self._snapshot_message is None:
+            await self._refresh()
+        return self._snapshot_message
+
+    def subscribe(self) -> Subscriber:
+        subscriber = Subscriber(self.queue_size)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self.subscribers.discard(subscriber)
+
+    async def _refresh(self) -> Optional[bytes]:
+        """Recompute the view; returns the encoded diff, or None if nothing changed"""
+        districts, state = await self.compute()
+        changed = {did: values for did, values in districts.items() if self.districts.get(did) != values}
+        removed = [did for did in self.districts if did not in districts]
+        state_changed = state != self.state
+        if self._snapshot_message is not None and not (changed or removed or state_changed):
+            return None
+
+        self.version += 1
+        self.districts, self.state = districts, state
+        self._snapshot_message = sse_message("snapshot", self.version, {"districts": districts, "state": state})
+        diff = {"districts": changed}
+        if removed:
+            diff["removed"] = removed
+        if state_changed:
+            diff["state"] = state
+        return sse_message("update", self.version, diff)
+
+    async def _run(self):
+        while True:
+            await self._changed.wait()
+            # Let bursts of writes (e.g. batched ingest) settle into one publication
+            await asyncio.sleep(self.debounce)
+            self._changed.clear()
+            try:
+                message = await self._refresh()
+            except Exception as e:
+                logger.error(f"Failed to compute metric update: {e}")
+                continue
+            if message is not None:
+                self.publish(message)
+
+    def publish(self, message: bytes):
+        self.published += 1
+        for subscriber in list(self.subscribers):
+            try:
+                subscriber.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self._coalesce(subscriber)
+
+    def _coalesce(self, subscriber: Subscriber):
+        """Replace a slow subscriber's backlog with one full snapshot, or drop it if it keeps lagging"""
+        subscriber.overflows += 1
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        if subscriber.overflows > self.max_overflows:
+            self._close(subscriber)
+            return
+        subscriber.queue.put_nowait(self._snapshot_message)
+
+    def _close(self, subscriber: Subscriber):
+        self.dropped += 1
+        subscriber.closed = True
+        self.subscribers.discard(subscriber)
+        # Wake the streaming loop so it can end the response
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(None)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self.subscribers),
+            "version": self.version,
+            "published": self.published,
+            "dropped_subscribers": self.dropped,
+        }
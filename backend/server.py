@@ -1,22 +1,41 @@
 import asyncio
+import csv
+import functools
+import hashlib
+import importlib.util
+import inspect as pyinspect
+import io
 import logging
 import os
+import time
 import uuid
-from collections import defaultdict
+from collections import OrderedDict, defaultdict, deque
+from contextvars import ContextVar
 from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional
 
-import requests
 from dotenv import load_dotenv
-from fastapi import APIRouter, FastAPI, HTTPException
+from fastapi import (APIRouter, Depends, FastAPI, HTTPException, Query, Request,
+                     Response)
 from pydantic import BaseModel, ConfigDict, Field
-from sqlalchemy import (JSON, Column, DateTime, Float, ForeignKey, Integer,
-                        String, desc, func, select, text)
+from sqlalchemy import (JSON, Boolean, Column, DateTime, Float, ForeignKey,
+                        Index, Integer, String, case, delete, desc, event,
+                        func, insert, inspect, literal, select, text, true,
+                        tuple_, update)
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 # SQLAlchemy async imports
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from fastapi.responses import ORJSONResponse
 from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import StreamingResponse
+
+from payloads import EncodedPayload, dumps, isoformat
+from push import MetricsBroadcaster
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -34,11 +53,149 @@ else:
         DATABASE_URL = raw_db.replace('postgresql://', 'postgresql+asyncpg://', 1)
     else:
         DATABASE_URL = raw_db
-engine = create_async_engine(DATABASE_URL, future=True)
+
+
+def env_flag(name: str, default: bool) -> bool:
+    return os.environ.get(name, str(default)).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+# Pool sizing; tune against /api/db/stats under real traffic
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '10'))
+DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', '20'))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', '30'))
+DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', '1800'))
+DB_POOL_PRE_PING = env_flag('DB_POOL_PRE_PING', True)
+DB_STATEMENT_CACHE_SIZE = int(os.environ.get('DB_STATEMENT_CACHE_SIZE', '500'))
+DB_STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', '15000'))
+
+
+class DbStats:
+    """Pool checkout waits plus per-route request latency and query counts (bounded samples)"""
+
+    SAMPLES = 1000
+
+    def __init__(self):
+        self.checkout_waits = deque(maxlen=self.SAMPLES)
+        self.checkouts = 0
+        self.max_checkout_wait = 0.0
+        self.queries = 0
+        self.routes: Dict[str, dict] = {}
+
+    def record_checkout(self, seconds: float):
+        self.checkouts += 1
+        self.checkout_waits.append(seconds)
+        self.max_checkout_wait = max(self.max_checkout_wait, seconds)
+
+    def record_request(self, route: str, seconds: float, queries: int, db_seconds: float):
+        stats = self.routes.setdefault(route, {"requests": 0, "queries": 0, "db_seconds": 0.0, "latencies": deque(maxlen=self.SAMPLES)})
+        stats["requests"] += 1
+        stats["queries"] += queries
+        stats["db_seconds"] += db_seconds
+        stats["latencies"].append(seconds)
+
+    @staticmethod
+    def percentiles_ms(samples) -> dict:
+        ordered = sorted(samples)
+        if not ordered:
+            return {}
+        pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 2)  # noqa: E731
+        return {"p50_ms": pick(0.50), "p95_ms": pick(0.95), "p99_ms": pick(0.99)}
+
+    def snapshot(self, pool) -> dict:
+        return {
+            "pool": {
+                "size": DB_POOL_SIZE,
+                "max_overflow": DB_MAX_OVERFLOW,
+                "checked_out": pool.checkedout() if hasattr(pool, 'checkedout') else None,
+                "status": pool.status(),
+            },
+            "checkout_wait": {
+                "checkouts": self.checkouts,
+                "max_ms": round(self.max_checkout_wait * 1000, 2),
+                **self.percentiles_ms(self.checkout_waits),
+            },
+            "queries": self.queries,
+            "routes": {
+                route: {
+                    "requests": r["requests"],
+                    "queries_per_request": round(r["queries"] / r["requests"], 2),
+                    "db_ms_per_request": round(r["db_seconds"] / r["requests"] * 1000, 2),
+                    **self.percentiles_ms(r["latencies"]),
+                }
+                for route, r in sorted(self.routes.items())
+            },
+        }
+
+
+db_stats = DbStats()
+# [query count, db seconds] for the request being served, set by DbMetricsMiddleware
+request_db_usage: ContextVar[Optional[list]] = ContextVar('request_db_usage', default=None)
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waited for a free connection"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_stats.record_checkout(time.perf_counter() - start)
+
+
+engine_kwargs = {
+    "poolclass": InstrumentedPool,
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+    "pool_recycle": DB_POOL_RECYCLE,
+    "pool_pre_ping": DB_POOL_PRE_PING,
+}
+if DATABASE_URL.startswith('postgresql+asyncpg'):
+    engine_kwargs["connect_args"] = {
+        "prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+        "server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)},
+    }
+engine = create_async_engine(DATABASE_URL, future=True, **engine_kwargs)
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+def _record_query(conn):
+    elapsed = time.perf_counter() - conn.info['query_start'].pop()
+    db_stats.queries += 1
+    usage = request_db_usage.get()
+    if usage is not None:
+        usage[0] += 1
+        usage[1] += elapsed
+
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def _stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    _record_query(conn)
+
+
+@event.listens_for(engine.sync_engine, "handle_error")
+def _stop_failed_query_timer(context):
+    # after_cursor_execute is skipped when a statement fails; the connection is None for connect errors
+    conn = context.connection
+    if conn is not None and conn.info.get('query_start'):
+        _record_query(conn)
+
+
 AsyncSessionLocal = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
 Base = declarative_base()
 
 
+# States are two-letter codes (district ids start with theirs); routes default to DEFAULT_STATE
+KARNATAKA_STATE = 'KA'
+DEFAULT_STATE = os.environ.get('DEFAULT_STATE', KARNATAKA_STATE)
+STATE_PATTERN = '^[A-Z]{2}$'
+
+
 # ORM models
 class DistrictORM(Base):
     __tablename__ = 'districts'
@@ -47,13 +204,17 @@ class DistrictORM(Base):
     name_kn = Column(String)
     feature = Column(String)
     coordinates = Column(JSON)
+    state = Column(String, default=DEFAULT_STATE, index=True)
 
 
 class MetricORM(Base):
     __tablename__ = 'metrics'
+    # year is part of the primary key because Postgres partitions the table by it
     id = Column(String, primary_key=True, index=True)
     district_id = Column(String, ForeignKey('districts.id'))
-    year = Column(Integer)
+    # Copied from the district so per-state reads need no join
+    state = Column(String)
+    year = Column(Integer, primary_key=True)
     month = Column(Integer)
     total_job_days = Column(Float)
     target_job_days = Column(Float)
@@ -62,13 +223,376 @@ class MetricORM(Base):
     performance_index = Column(Float)
     timestamp = Column(DateTime(timezone=True))
 
+    __table_args__ = (
+        # One row per district and month; also the conflict target for upserts
+        Index('uq_metrics_district_year_month', 'district_id', 'year', 'month', unique=True),
+        # Serves "WHERE district_id = ? ORDER BY year DESC, month DESC" without a sort
+        Index('ix_metrics_district_year_month_desc', 'district_id', desc('year'), desc('month')),
+        Index('ix_metrics_state_year_month', 'state', 'year', 'month'),
+        # One partition per year on Postgres (see MetricPartitions); ignored elsewhere
+        {'postgresql_partition_by': 'RANGE (year)'},
+    )
+
+
+# Numeric metric columns, as selectable by the analytics and history routes
+METRIC_FIELDS = ('total_job_days', 'target_job_days', 'households_covered', 'wages_paid', 'performance_index')
+
+
+# Rollups: maintained on every metrics write so dashboard reads don't scan history
+class StateRollupORM(Base):
+    __tablename__ = 'state_monthly_rollup'
+    state = Column(String, primary_key=True)
+    year = Column(Integer, primary_key=True)
+    month = Column(Integer, primary_key=True)
+    total_job_days = Column(Float)
+    total_households = Column(Integer)
+    total_wages = Column(Float)
+    avg_performance = Column(Float)
+    district_count = Column(Integer)
+    best_district = Column(String)
+    worst_district = Column(String)
+    refreshed_at = Column(DateTime(timezone=True))
+
+
+class DistrictRollupORM(Base):
+    __tablename__ = 'district_monthly_rollup'
+    district_id = Column(String, ForeignKey('districts.id'), primary_key=True)
+    year = Column(Integer, primary_key=True)
+    month = Column(Integer, primary_key=True)
+    state = Column(String, index=True)
+    total_job_days = Column(Float)
+    households_covered = Column(Integer)
+    wages_paid = Column(Float)
+    performance_index = Column(Float)
+    # True on each district's newest month; the current state dashboard reads only these rows
+    is_latest = Column(Boolean, default=False, index=True)
+    refreshed_at = Column(DateTime(timezone=True))
+
+
+# Rollup tables reference districts.id as a string, which legacy databases (integer ids) can't satisfy,
+# so create_tables leaves them to the migrations, which only run on the current layout
+ROLLUP_TABLES = (StateRollupORM.__table__, DistrictRollupORM.__table__)
+# Arbitrary application-wide key for pg_advisory_xact_lock
+ROLLUP_LOCK_ID = 7_210_001
+
+
+def create_tables(sync_conn):
+    """Base.metadata.create_all, minus the rollup tables"""
+    Base.metadata.create_all(sync_conn, tables=[t for t in Base.metadata.sorted_tables if t not in ROLLUP_TABLES])
+
+
+async def refresh_rollups(conn, periods=None, district_ids=None):
+    """Recompute rollup rows touched by a metrics write.
+
+    periods is a collection of (year, month) and district_ids the districts written; None for both
+    rebuilds everything. Runs inside the caller's transaction so rollups commit with the metrics.
+    On Postgres concurrent writers (e.g. periodic ingest and a CLI bulk load) take turns, since each
+    deletes and re-inserts rows the other may be writing.
+    """
+    if conn.dialect.name == 'postgresql':
+        await conn.execute(select(func.pg_advisory_xact_lock(ROLLUP_LOCK_ID)))
+    m = MetricORM.__table__
+    now = literal(datetime.now(timezone.utc), DateTime(timezone=True))
+    in_periods = tuple_(m.c.year, m.c.month).in_(list(periods)) if periods is not None else true()
+    in_districts = m.c.district_id.in_(list(district_ids)) if district_ids is not None else true()
+
+    # State rows for every touched month, for every state (the month may span several)
+    ranked = m.alias('ranked')
+    ranked_perf = func.coalesce(ranked.c.performance_index, 0)
+
+    def pick_district(order):
+        return select(ranked.c.district_id).where(
+            ranked.c.state == m.c.state, ranked.c.year == m.c.year, ranked.c.month == m.c.month
+        ).order_by(order, ranked.c.district_id).limit(1).scalar_subquery()
+
+    state_rows = select(
+        m.c.state, m.c.year, m.c.month,
+        func.sum(m.c.total_job_days), func.sum(m.c.households_covered), func.sum(m.c.wages_paid),
+        func.avg(func.coalesce(m.c.performance_index, 0)), func.count(),
+        pick_district(desc(ranked_perf)), pick_district(ranked_perf), now,
+    ).where(in_periods).group_by(m.c.state, m.c.year, m.c.month)
+    s = StateRollupORM.__table__
+    state_filter = tuple_(s.c.year, s.c.month).in_(list(periods)) if periods is not None else true()
+    await conn.execute(delete(s).where(state_filter))
+    await conn.execute(insert(s).from_select([
+        'state', 'year', 'month', 'total_job_days', 'total_households', 'total_wages',
+        'avg_performance', 'district_count', 'best_district', 'worst_district', 'refreshed_at',
+    ], state_rows))
+
+    # District rows for the touched (district, month) pairs, then re-flag each touched district's newest month
+    d = DistrictRollupORM.__table__
+    d_periods = tuple_(d.c.year, d.c.month).in_(list(periods)) if periods is not None else true()
+    d_districts = d.c.district_id.in_(list(district_ids)) if district_ids is not None else true()
+    await conn.execute(delete(d).where(d_periods, d_districts))
+    await conn.execute(insert(d).from_select([
+        'district_id', 'year', 'month', 'state', 'total_job_days', 'households_covered', 'wages_paid',
+        'performance_index', 'is_latest', 'refreshed_at',
+    ], select(
+        m.c.district_id, m.c.year, m.c.month, m.c.state, m.c.total_job_days, m.c.households_covered,
+        m.c.wages_paid, m.c.performance_index, literal(False), now,
+    ).where(in_periods, in_districts)))
+
+    # Each district's newest month is found in one grouped pass, not per row
+    newest = d.alias('newest')
+    newest_periods = select(newest.c.district_id, func.max(newest.c.year * 12 + newest.c.month)).where(
+        newest.c.district_id.in_(list(district_ids)) if district_ids is not None else true()
+    ).group_by(newest.c.district_id)
+    is_newest = tuple_(d.c.district_id, d.c.year * 12 + d.c.month).in_(newest_periods)
+    # Only rows whose flag flips are written; a full rebuild would otherwise rewrite the whole table
+    await conn.execute(update(d).where(d_districts, d.c.is_latest != is_newest).values(is_latest=is_newest))
+
+
+# Year partitions
+# On Postgres metrics is range-partitioned by year, so queries bounded by year only scan those years'
+# partitions and old years can be detached or dropped whole. A row for a year without a partition is
+# rejected, so writers call metric_partitions.ensure() for the years they are about to write.
+def metric_partition_ddl(year: int) -> str:
+    return f"CREATE TABLE IF NOT EXISTS metrics_y{year} PARTITION OF metrics FOR VALUES FROM ({year}) TO ({year + 1})"
+
+
+class MetricPartitions:
+    """Creates missing yearly partitions of metrics; a no-op on other dialects or an unpartitioned table"""
+
+    def __init__(self):
+        self.partitioned: Optional[bool] = None
+        self.years: set = set()
+
+    async def ensure(self, conn, years):
+        """Create partitions for years that lack one, committing conn's transaction if it does"""
+        if conn.dialect.name != 'postgresql' or self.partitioned is False:
+            return
+        if self.partitioned is None:
+            relkind = (await conn.execute(text("SELECT relkind::text FROM pg_class WHERE oid = 'metrics'::regclass"))).scalar()
+            self.partitioned = relkind == 'p'
+            if not self.partitioned:
+                return
+            names = (await conn.execute(text(
+                "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = 'metrics'::regclass"
+            ))).scalars().all()
+            self.years = {int(name[len('metrics_y'):]) for name in names if name[len('metrics_y'):].isdigit()}
+        missing = sorted({int(year) for year in years} - self.years)
+        if not missing:
+            return
+        # Creating a partition locks the whole table, so do it in its own short transaction
+        for year in missing:
+            await conn.execute(text(metric_partition_ddl(year)))
+        await conn.commit()
+        self.years.update(missing)
+        logger.info(f"Created metrics partitions for {', '.join(map(str, missing))}")
+
+
+metric_partitions = MetricPartitions()
+
+
+async def add_state_columns(conn):
+    for table in ('districts', 'metrics'):
+        columns = await conn.run_sync(lambda c: {col['name'] for col in inspect(c).get_columns(table)})
+        if 'state' not in columns:
+            await conn.execute(text(f"ALTER TABLE {table} ADD COLUMN state VARCHAR"))
+    await conn.execute(text("UPDATE districts SET state = :state WHERE state IS NULL"), {"state": DEFAULT_STATE})
+    await conn.execute(text(
+        "UPDATE metrics SET state = (SELECT d.state FROM districts d WHERE d.id = metrics.district_id) "
+        "WHERE state IS NULL"
+    ))
+
+
+async def rebuild_rollups(conn):
+    # Rollup tables are derived data, so changing their keys is a drop, create and refill
+    for table in ROLLUP_TABLES:
+        await conn.run_sync(lambda c: table.drop(c, checkfirst=True))
+        await conn.run_sync(table.create)
+    await refresh_rollups(conn)
+
+
+async def partition_metrics_by_year(conn):
+    """Rebuild a plain Postgres metrics table as one partitioned by year, copying every row"""
+    if conn.dialect.name != 'postgresql':
+        return
+    relkind = (await conn.execute(text("SELECT relkind::text FROM pg_class WHERE oid = 'metrics'::regclass"))).scalar()
+    if relkind == 'p':
+        return
+    await conn.execute(text("ALTER TABLE metrics RENAME TO metrics_heap"))
+    await conn.execute(text("CREATE TABLE metrics (LIKE metrics_heap INCLUDING DEFAULTS) PARTITION BY RANGE (year)"))
+    years = (await conn.execute(text("SELECT DISTINCT year FROM metrics_heap WHERE year IS NOT NULL"))).scalars().all()
+    for year in years:
+        await conn.execute(text(metric_partition_ddl(year)))
+    copied = await conn.execute(text("INSERT INTO metrics SELECT * FROM metrics_heap WHERE year IS NOT NULL"))
+    skipped = (await conn.execute(text("SELECT count(*) FROM metrics_heap WHERE year IS NULL"))).scalar()
+    if skipped:
+        logger.warning(f"Dropped {skipped} metrics rows without a year while partitioning")
+    logger.info(f"Copied {copied.rowcount} metrics rows into {len(years)} year partitions")
+    # Constraint and index names are free again once the old table is gone
+    await conn.execute(text("DROP TABLE metrics_heap"))
+    await conn.execute(text("ALTER TABLE metrics ADD PRIMARY KEY (id, year)"))
+    await conn.execute(text("ALTER TABLE metrics ADD FOREIGN KEY (district_id) REFERENCES districts (id)"))
+    for index in MetricORM.__table__.indexes:
+        await conn.run_sync(index.create)
+
+
+# Schema migrations
+# create_all only creates missing tables, so changes to existing tables are applied here.
+# Each migration runs once, in order, and every statement must be safe to re-run.
+# A statement is either SQL text or an async callable taking the connection.
+MIGRATIONS = [
+    (1, "metrics: drop duplicate months, add unique (district_id, year, month) and composite index", [
+        """
+        DELETE FROM metrics WHERE id IN (
+            SELECT id FROM (
+                SELECT id, row_number() OVER (
+                    PARTITION BY district_id, year, month ORDER BY timestamp DESC, id
+                ) AS rn
+                FROM metrics
+            ) ranked
+            WHERE rn > 1
+        )
+        """,
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_metrics_district_year_month ON metrics (district_id, year, month)",
+        "CREATE INDEX IF NOT EXISTS ix_metrics_district_year_month_desc ON metrics (district_id, year DESC, month DESC)",
+    ]),
+    # Rollup tables were filled here once; migration 3 now creates and fills them
+    (2, "backfill state and district monthly rollups", []),
+    (3, "districts/metrics: add state; rebuild rollups per state", [
+        add_state_columns,
+        "CREATE INDEX IF NOT EXISTS ix_districts_state ON districts (state)",
+        "CREATE INDEX IF NOT EXISTS ix_metrics_state_year_month ON metrics (state, year, month)",
+        rebuild_rollups,
+    ]),
+    (4, "metrics: range-partition by year (Postgres)", [partition_metrics_by_year]),
+]
+
+
+async def disable_statement_timeout(conn):
+    """Lift DB_STATEMENT_TIMEOUT_MS for the rest of conn's transaction; it is meant for requests, not bulk work"""
+    if conn.dialect.name == 'postgresql':
+        await conn.execute(text("SET LOCAL statement_timeout = 0"))
+
+
+async def run_migrations(conn):
+    """Apply pending MIGRATIONS inside the given connection's transaction"""
+    # Migrations rewrite whole tables (partitioning copies every metrics row)
+    await disable_statement_timeout(conn)
+    await conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version INTEGER PRIMARY KEY, description VARCHAR, applied_at TIMESTAMP WITH TIME ZONE)"
+    ))
+    applied = set((await conn.execute(text("SELECT version FROM schema_migrations"))).scalars().all())
+
+    # Older databases use a different metrics layout; leave those untouched
+    metric_columns = await conn.run_sync(lambda c: {col['name'] for col in inspect(c).get_columns('metrics')})
+    if not {'district_id', 'year', 'month'} <= metric_columns:
+        logger.warning("metrics table has a legacy layout; skipping schema migrations")
+        return
+
+    for version, description, statements in MIGRATIONS:
+        if version in applied:
+            continue
+        for stmt in statements:
+            if callable(stmt):
+                await stmt(conn)
+            else:
+                await conn.execute(text(stmt))
+        await conn.execute(
+            text("INSERT INTO schema_migrations (version, description, applied_at) VALUES (:v, :d, :t)"),
+            {"v": version, "d": description, "t": datetime.now(timezone.utc)}
+        )
+        logger.info(f"Applied schema migration {version}: {description}")
+
+# Readiness
+# The startup hook only schedules the bootstrap, so uvicorn accepts connections (and answers /healthz)
+# immediately while the database is still coming up; /api routes return 503 until it finishes.
+BOOTSTRAP_RETRY_INITIAL = float(os.environ.get('BOOTSTRAP_RETRY_INITIAL', '0.5'))
+BOOTSTRAP_RETRY_MAX = float(os.environ.get('BOOTSTRAP_RETRY_MAX', '30'))
+# Only an unreachable database is worth waiting for; bad SQL or a broken migration fails the same way every time
+RETRYABLE_BOOTSTRAP_ERRORS = (OSError, asyncio.TimeoutError, OperationalError, InterfaceError, PoolTimeoutError)
+# Postgres connection exceptions (class 08), server starting up or shutting down (57P0x), too many connections
+RETRYABLE_SQLSTATES = ('08', '57P0', '53300')
+
+
+def retryable_bootstrap_error(e: Exception) -> bool:
+    if isinstance(e, RETRYABLE_BOOTSTRAP_ERRORS):
+        return True
+    # asyncpg's server-side errors all surface as a plain DBAPIError; the SQLSTATE tells them apart
+    sqlstate = getattr(getattr(e, 'orig', None), 'sqlstate', None)
+    return bool(sqlstate) and sqlstate.startswith(RETRYABLE_SQLSTATES)
+
+
+class Readiness:
+    """Progress of the background bootstrap, as reported by /readyz"""
+
+    def __init__(self):
+        self.ready = False
+        self.failed = False
+        self.stage = "starting"
+        self.attempts = 0
+        self.last_error: Optional[str] = None
+        self.started = time.monotonic()
+        self.ready_after: Optional[float] = None
+
+    def mark_ready(self):
+        self.ready = True
+        self.stage = "ready"
+        self.last_error = None
+        self.ready_after = time.monotonic() - self.started
+
+    def mark_failed(self, error: Exception):
+        self.failed = True
+        self.stage = f"failed ({self.stage})"
+        self.last_error = type(error).__name__
+
+    def snapshot(self) -> dict:
+        return {
+            "ready": self.ready,
+            "failed": self.failed,
+            "stage": self.stage,
+            "attempts": self.attempts,
+            "last_error": self.last_error,
+            "ready_after_seconds": round(self.ready_after, 3) if self.ready_after is not None else None,
+        }
+
+
+readiness = Readiness()
+
+
+async def require_ready():
+    if readiness.failed:
+        raise HTTPException(status_code=503, detail=f"Service failed to start ({readiness.stage})")
+    if not readiness.ready:
+        raise HTTPException(status_code=503, detail=f"Service is starting ({readiness.stage})", headers={"Retry-After": "2"})
+
 # Create the main app
-app = FastAPI()
-api_router = APIRouter(prefix="/api")
+app = FastAPI(default_response_class=ORJSONResponse)
+api_router = APIRouter(prefix="/api", dependencies=[Depends(require_ready)])
+
+
+class DbMetricsMiddleware:
+    """Attributes request latency and DB query count/time to the matched route template"""
+
+    def __init__(self, app):
+        self.app = app
+        self.route_paths: Dict[object, str] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        usage = [0, 0.0]
+        token = request_db_usage.set(usage)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_db_usage.reset(token)
+            endpoint = scope.get("endpoint")
+            if endpoint is not None:
+                if not self.route_paths:
+                    self.route_paths = {r.endpoint: r.path for r in app.routes if hasattr(r, 'endpoint')}
+                route = f"{scope['method']} {self.route_paths.get(endpoint, endpoint.__name__)}"
+                db_stats.record_request(route, time.perf_counter() - start, usage[0], usage[1])
 
 # MGNREGA API Configuration
 MGNREGA_API_KEY = os.environ.get('MGNREGA_API_KEY', '')
 MGNREGA_BASE_URL = "https://api.data.gov.in/resource"
+INGEST_INTERVAL_HOURS = float(os.environ.get('INGEST_INTERVAL_HOURS', '0'))
 
 # Karnataka Districts
 KARNATAKA_DISTRICTS = [
@@ -112,11 +636,13 @@ class District(BaseModel):
     name_kn: str
     feature: str
     coordinates: Optional[List[float]] = [15.3173, 75.7139]  # Default Karnataka center
+    state: Optional[str] = None
 
 class MonthlyMetric(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     district_id: str
+    state: Optional[str] = None
     year: int
     month: int
     total_job_days: float
@@ -140,77 +666,757 @@ class StateStatistics(BaseModel):
     best_district: Optional[str] = None
     worst_district: Optional[str] = None
 
-# Initialize districts in database
-@app.on_event("startup")
-async def startup_event():
-    # Try connecting to the database with retry/backoff so the backend waits for Postgres readiness
-    max_retries = 30
-    delay_seconds = 1
-    for attempt in range(1, max_retries + 1):
+class StateYearOverYear(BaseModel):
+    year: int
+    month: int
+    current: StateStatistics
+    previous: Optional[StateStatistics] = None
+    change_pct: Dict[str, Optional[float]] = {}
+
+class MetricHistory(BaseModel):
+    district_id: str
+    bucket: str
+    fields: List[str]
+    # MonthlyMetric rows (only the requested fields if `fields` is given) for month buckets,
+    # {year, month, label, months, <fields>} aggregates for quarter and fin_year buckets
+    items: List[Dict[str, Any]] = []
+    next_cursor: Optional[str] = None
+
+# Response cache
+class ResponseCache:
+    """Bounded LRU cache with a TTL that coalesces concurrent misses for the same key"""
+
+    def __init__(self, maxsize: int = 256, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._pending: Dict[str, asyncio.Future] = {}
+        # Bumped on invalidation so loads that started earlier are not stored afterwards
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    async def get_or_load(self, key: str, loader):
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+            self.expirations += 1
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        generation = self._generation
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
         try:
+            value = await loader()
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                future.exception()  # mark retrieved when no request was waiting
+            raise
+        finally:
+            self._pending.pop(key, None)
+
+        future.set_result(value)
+        if generation == self._generation:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def invalidate(self):
+        self._entries.clear()
+        self._generation += 1
+        self.invalidations += 1
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+response_cache = ResponseCache(
+    maxsize=int(os.environ.get('RESPONSE_CACHE_MAXSIZE', '256')),
+    ttl=float(os.environ.get('RESPONSE_CACHE_TTL', '300')),
+)
+
+
+def with_injected(handler, **annotations):
+    """handler's signature plus keyword-only parameters for FastAPI to inject (e.g. request=Request)"""
+    signature = pyinspect.signature(handler)
+    return signature.replace(parameters=[
+        *(pyinspect.Parameter(name, pyinspect.Parameter.KEYWORD_ONLY, annotation=annotation)
+          for name, annotation in annotations.items() if name not in signature.parameters),
+        *(p.replace(kind=pyinspect.Parameter.KEYWORD_ONLY) for p in signature.parameters.values()),
+    ])
+
+
+def cached_response(handler):
+    """Serve a read-only route handler from response_cache, keyed by its name and arguments.
+
+    The result is cached as an EncodedPayload, so hits skip response_model validation and JSON encoding
+    and reuse the body already compressed for the client's Accept-Encoding.
+    """
+    async def load(kwargs):
+        return EncodedPayload(await handler(**kwargs))
+
+    @functools.wraps(handler)
+    async def wrapper(request: Request, **kwargs):
+        key = handler.__name__ + ''.join(f":{k}={kwargs[k]}" for k in sorted(kwargs))
+        payload = await response_cache.get_or_load(key, lambda: load(kwargs))
+        return payload.response(request)
+
+    wrapper.__signature__ = with_injected(handler, request=Request)
+    return wrapper
+
+
+def on_metrics_written(states: Optional[Iterable[str]] = None):
+    """Hook to call after any write to the metrics table, with the states written (None: any of them)"""
+    response_cache.invalidate()
+    for state, store in _analytics_stores.items():
+        if states is None or state in states:
+            store.invalidate()
+    for state, broadcaster in _broadcasters.items():
+        if states is None or state in states:
+            broadcaster.notify()
+
+
+# Analytics snapshot
+METRIC_FIELD_PATTERN = '^(' + '|'.join(METRIC_FIELDS) + ')$'
+
+
+async def analytics_start_year(session, state: str) -> Optional[int]:
+    """First year a state's snapshot needs, or None if the state has no metrics.
+
+    Snapshots only use each district's newest month and the month before it, so they start a year before
+    the oldest of those newest months (taken from the rollup's is_latest rows). Every district that counts
+    towards /metrics/state is therefore in the snapshot, however stale, and the literal year bound lets
+    Postgres skip every older partition.
+    """
+    oldest_latest = (await session.execute(select(func.min(DistrictRollupORM.year)).where(
+        DistrictRollupORM.state == state, DistrictRollupORM.is_latest == true()))).scalar()
+    return oldest_latest - 1 if oldest_latest is not None else None
+
+
+async def load_analytics_columns(state: str):
+    async with AsyncSessionLocal() as session:
+        district_ids = (await session.execute(select(DistrictORM.id).where(DistrictORM.state == state))).scalars().all()
+        start_year = await analytics_start_year(session, state)
+        if start_year is None:
+            return district_ids, []
+        rows = (await session.execute(select(
+            MetricORM.district_id, MetricORM.year, MetricORM.month,
+            *(getattr(MetricORM, field) for field in METRIC_FIELDS)
+        ).where(MetricORM.state == state, MetricORM.year >= start_year))).all()
+    return district_ids, [tuple(r) for r in rows]
+
+
+ANALYTICS_MAX_AGE = float(os.environ.get('ANALYTICS_MAX_AGE', '300'))
+_analytics_stores: Dict[str, Any] = {}
+
+
+def analytics_store(state: str = DEFAULT_STATE):
+    """The process-wide SnapshotStore for a state; analytics (and NumPy) are imported on first use, not at startup"""
+    store = _analytics_stores.get(state)
+    if store is None:
+        from analytics import SnapshotStore
+        store = _analytics_stores[state] = SnapshotStore(
+            functools.partial(load_analytics_columns, state), METRIC_FIELDS, max_age=ANALYTICS_MAX_AGE)
+    return store
+
+
+# Push channel
+SSE_QUEUE_SIZE = int(os.environ.get('SSE_QUEUE_SIZE', '16'))
+SSE_KEEPALIVE_SECONDS = float(os.environ.get('SSE_KEEPALIVE_SECONDS', '15'))
+
+
+async def compute_push_view(state: str = DEFAULT_STATE):
+    """Per-district comparison values and state totals, computed once per update for all of a state's subscribers"""
+    snapshot = await analytics_store(state).get()
+    perf = snapshot.latest_values('performance_index')
+    job_days = snapshot.latest_values('total_job_days')
+    households = snapshot.latest_values('households_covered')
+    categories = snapshot.categories()
+    districts = {
+        did: {
+            "performance_index": perf[i],
+            "total_job_days": job_days[i],
+            "households_covered": households[i],
+            "performance_category": str(categories[i]),
+        }
+        for i, did in enumerate(snapshot.district_ids)
+    }
+    return districts, snapshot.state_totals()
+
+
+_broadcasters: Dict[str, MetricsBroadcaster] = {}
+
+
+def broadcaster_for(state: str = DEFAULT_STATE) -> MetricsBroadcaster:
+    """The process-wide push broadcaster for a state, started on its first subscriber"""
+    broadcaster = _broadcasters.get(state)
+    if broadcaster is None:
+        broadcaster = _broadcasters[state] = MetricsBroadcaster(
+            functools.partial(compute_push_view, state), queue_size=SSE_QUEUE_SIZE)
+        broadcaster.start()
+    return broadcaster
+
+
+# Conditional requests
+METRICS_MAX_AGE = int(os.environ.get('METRICS_MAX_AGE', '60'))
+
+
+async def metrics_version(district_ids: Optional[List[str]] = None, state: Optional[str] = None):
+    """(latest metric timestamp, row count, districts found) for some districts, one state or everything,
+    or None if unavailable. Districts found counts the given district_ids that exist (None without ids)."""
+    async def load():
+        if data_access.legacy:
+            return None
+        found = literal(None)
+        if district_ids is not None:
+            found = select(func.count()).select_from(DistrictORM).where(DistrictORM.id.in_(district_ids)).scalar_subquery()
+        stmt = select(func.max(MetricORM.timestamp), func.count(), found).select_from(MetricORM)
+        if district_ids is not None:
+            stmt = stmt.where(MetricORM.district_id.in_(district_ids))
+        if state is not None:
+            stmt = stmt.where(MetricORM.state == state)
+        async with AsyncSessionLocal() as session:
+            last_modified, count, districts = (await session.execute(stmt)).one()
+        if last_modified is not None and last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        return last_modified, count, districts
+
+    scope = ','.join(district_ids) if district_ids is not None else '*'
+    return await response_cache.get_or_load(f"metrics_version:{scope}:{state or '*'}", load)
+
+
+def conditional_get(per_district: bool = False, district_ids=None):
+    """Add ETag/Last-Modified/Cache-Control to a metrics route and answer revalidations with 304.
+
+    The version token is checked before the wrapped handler runs, so a 304 never builds the body. It
+    covers the route's district_id with per_district, else the districts district_ids(kwargs) returns
+    (None meaning the state's), else the route's state.
+
+    RFC 9110 only allows a 304 where the response would otherwise be 2xx, so query parameters must be
+    validated by FastAPI (e.g. in a dependency) before this runs, and a per_district route whose
+    district does not exist goes straight to the handler and its 404.
+    """
+    def decorator(handler):
+        passes_request = 'request' in pyinspect.signature(handler).parameters
+
+        @functools.wraps(handler)
+        async def wrapper(request: Request, response: Response, **kwargs):
+            if passes_request:
+                kwargs['request'] = request
+            # State-scoped routes only change when that state's metrics do, explicit districts when theirs do
+            ids = [kwargs['district_id']] if per_district else district_ids(kwargs) if district_ids else None
+            version = await metrics_version(ids, None if ids is not None else kwargs.get('state'))
+            if version is None or (per_district and not version[2]):
+                return await handler(**kwargs)
+
+            last_modified, count, _ = version
+            scope = ','.join(ids) if ids is not None else kwargs.get('state', '*')
+            stamp = last_modified.isoformat() if last_modified else ''
+            digest = hashlib.sha1(f"{handler.__name__}:{scope}:{stamp}:{count}".encode()).hexdigest()[:20]
+            headers = {
+                "ETag": f'W/"{digest}"',
+                "Cache-Control": f"public, max-age={METRICS_MAX_AGE}, must-revalidate",
+                "Vary": "Accept-Encoding",
+            }
+            if last_modified:
+                headers["Last-Modified"] = format_datetime(last_modified.astimezone(timezone.utc), usegmt=True)
+
+            if not_modified(request, headers["ETag"], last_modified):
+                return Response(status_code=304, headers=headers)
+            result = await handler(**kwargs)
+            # Cached handlers return a ready Response, which FastAPI sends without merging `response`
+            (result if isinstance(result, Response) else response).headers.update(headers)
+            return result
+
+        # Expose request/response to FastAPI alongside the handler's own parameters
+        wrapper.__signature__ = with_injected(handler, request=Request, response=Response)
+        return wrapper
+    return decorator
+
+
+def not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match is not None:
+        # Weak comparison, as RFC 9110 requires for If-None-Match
+        candidates = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+        return '*' in candidates or etag.removeprefix('W/') in candidates
+    if_modified_since = request.headers.get('if-modified-since')
+    if if_modified_since and last_modified:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+# Initialize the database in the background
+async def bootstrap():
+    """Create/migrate the schema and seed data, retrying with exponential backoff until the database answers.
+
+    Errors other than connection failures are not retried: the bootstrap gives up and /healthz reports it.
+    """
+    delay = BOOTSTRAP_RETRY_INITIAL
+    while True:
+        readiness.attempts += 1
+        try:
+            readiness.stage = "migrating"
             async with engine.begin() as conn:
-                await conn.run_sync(Base.metadata.create_all)
+                await conn.run_sync(create_tables)
+                await run_migrations(conn)
+                await detect_data_access(conn)
+            async with engine.connect() as conn:
+                # Partitions for the coming year exist before ingest needs them
+                year = datetime.now(timezone.utc).year
+                await metric_partitions.ensure(conn, [year, year + 1])
 
             # Initialize districts if not exists
+            readiness.stage = "seeding"
             async with AsyncSessionLocal() as session:
                 existing = (await session.execute(select(func.count()).select_from(DistrictORM))).scalar_one()
                 if existing == 0:
-                    districts_objs = []
-                    for d in KARNATAKA_DISTRICTS:
-                        districts_objs.append(DistrictORM(
-                            id=d['id'], name_en=d['name_en'], name_kn=d['name_kn'], feature=d['feature'], coordinates=[15.3173, 75.7139]
-                        ))
-                    session.add_all(districts_objs)
+                    # Core executemany insert; no ORM objects are built
+                    district_rows = seed_districts()
+                    await session.execute(insert(DistrictORM), district_rows)
                     await session.commit()
-                    logger.info(f"Initialized {len(districts_objs)} districts")
+                    logger.info(f"Initialized {len(district_rows)} districts")
 
                 # Generate mock data if no metrics exist
                 existing_metrics = (await session.execute(select(func.count()).select_from(MetricORM))).scalar_one()
                 if existing_metrics == 0:
                     await generate_mock_metrics()
                     logger.info("Generated mock metrics data")
-
-            # If we reach here, DB operations succeeded
             break
         except Exception as e:
-            logger.warning(f"Database not ready (attempt {attempt}/{max_retries}): {e}")
-            if attempt == max_retries:
-                logger.error("Exceeded max retries for DB connection during startup")
-                raise
-            await asyncio.sleep(delay_seconds)
+            if not retryable_bootstrap_error(e):
+                logger.exception(f"Bootstrap failed (attempt {readiness.attempts}, {readiness.stage}); not retrying")
+                readiness.mark_failed(e)
+                return
+            # Only the exception type is exposed on /readyz; the message (which may name hosts) goes to the log
+            readiness.last_error = type(e).__name__
+            logger.warning(f"Database not ready (attempt {readiness.attempts}, {readiness.stage}): {e}; retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, BOOTSTRAP_RETRY_MAX)
+
+    readiness.mark_ready()
+    logger.info(f"Ready after {readiness.ready_after:.1f}s ({readiness.attempts} attempt(s))")
+
+    # Periodic data.gov.in ingest runs as a background task on the serving loop (all I/O is async)
+    if MGNREGA_API_KEY and INGEST_INTERVAL_HOURS > 0:
+        from ingest import run_periodic_ingest
+        app.state.ingest_task = asyncio.create_task(run_periodic_ingest(INGEST_INTERVAL_HOURS * 3600))
+        logger.info(f"Scheduled MGNREGA ingest every {INGEST_INTERVAL_HOURS}h")
+
+
+@app.on_event("startup")
+async def startup_event():
+    app.state.bootstrap_task = asyncio.create_task(bootstrap())
+
+
+@app.get("/healthz")
+async def healthz(response: Response):
+    """Liveness: the process is up and serving requests, and the bootstrap has not given up"""
+    if readiness.failed:
+        response.status_code = 503
+        return {"status": "failed", "stage": readiness.stage, "last_error": readiness.last_error}
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readyz(response: Response):
+    """Readiness: 200 once the database is bootstrapped, 503 while startup is still in progress or has failed"""
+    if not readiness.ready:
+        response.status_code = 503
+    return readiness.snapshot()
 
 # Generate mock data for demonstration
-async def generate_mock_metrics():
+def mock_metric_rows(district_ids, months: int = 6, end_date: Optional[datetime] = None):
+    """Yield random metrics rows for the given districts, one per calendar month going back from end_date"""
     import random
     from datetime import timedelta
 
-    current_date = datetime.now(timezone.utc)
-    metrics_objs = []
-    for district in KARNATAKA_DISTRICTS:
-        for month_offset in range(6):  # Last 6 months
+    current_date = end_date or datetime.now(timezone.utc)
+    for district_id in district_ids:
+        for month_offset in range(months):
+            # Step by calendar month so (district_id, year, month) stays unique
+            year, month_index = divmod(current_date.year * 12 + current_date.month - 1 - month_offset, 12)
             target_date = current_date - timedelta(days=30 * month_offset)
             target_job_days = random.randint(80000, 150000)
             actual_job_days = random.randint(int(target_job_days * 0.6), int(target_job_days * 1.1))
             performance = (actual_job_days / target_job_days) * 100
 
-            metric = MetricORM(
-                id=str(uuid.uuid4()),
-                district_id=district['id'],
-                year=target_date.year,
-                month=target_date.month,
-                total_job_days=actual_job_days,
-                target_job_days=target_job_days,
-                households_covered=random.randint(5000, 15000),
-                wages_paid=actual_job_days * random.uniform(180, 220),
-                performance_index=round(performance, 2),
-                timestamp=target_date
-            )
-            metrics_objs.append(metric)
-
-    if metrics_objs:
-        async with AsyncSessionLocal() as session:
-            session.add_all(metrics_objs)
-            await session.commit()
+            yield {
+                "id": str(uuid.uuid4()),
+                "district_id": district_id,
+                "year": year,
+                "month": month_index + 1,
+                "total_job_days": actual_job_days,
+                "target_job_days": target_job_days,
+                "households_covered": random.randint(5000, 15000),
+                "wages_paid": actual_job_days * random.uniform(180, 220),
+                "performance_index": round(performance, 2),
+                "timestamp": target_date
+            }
+
+async def generate_mock_metrics(district_ids: Optional[List[str]] = None, months: int = 6) -> int:
+    """Load mock metrics for the given districts (default: every Karnataka district) through the bulk loader"""
+    from bulk_load import load_metric_rows
+
+    if district_ids is None:
+        district_ids = [d['id'] for d in KARNATAKA_DISTRICTS]
+    # The bulk loader fires on_metrics_written
+    return await load_metric_rows(mock_metric_rows(district_ids, months))
+
+
+def seed_districts(count: Optional[int] = None, state: str = KARNATAKA_STATE) -> List[dict]:
+    """District rows to seed for a state: the Karnataka districts for KA, padded with synthetic ones
+    (KAS0031, ...) up to count. Other states get only synthetic districts, 30 by default."""
+    base = KARNATAKA_DISTRICTS if state == KARNATAKA_STATE else []
+    count = (len(base) or 30) if count is None else count
+    rows = [
+        {"id": d['id'], "name_en": d['name_en'], "name_kn": d['name_kn'], "feature": d['feature'], "coordinates": [15.3173, 75.7139], "state": state}
+        for d in base[:count]
+    ]
+    rows += [
+        {"id": f"{state}S{i:04d}", "name_en": f"Synthetic {state} {i}", "name_kn": f"Synthetic {state} {i}", "feature": "synthetic", "coordinates": [15.3173, 75.7139], "state": state}
+        for i in range(len(rows) + 1, count + 1)
+    ]
+    return rows
+
+# Export
+EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', '5000'))
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def parse_year_month(value: Optional[str], name: str):
+    if value is None:
+        return None
+    try:
+        year, month = (int(part) for part in value.split('-'))
+    except ValueError:
+        raise HTTPException(status_code=422, detail=f"{name} must look like YYYY-MM")
+    if not 1 <= month <= 12:
+        raise HTTPException(status_code=422, detail=f"{name} month must be 1-12")
+    return year, month
+
+
+def period_conditions(start=None, end=None) -> list:
+    """WHERE conditions for metrics between two inclusive (year, month) bounds.
+
+    The plain year comparisons are implied by the row comparisons but are what Postgres needs to prune
+    year partitions.
+    """
+    period = tuple_(MetricORM.year, MetricORM.month)
+    conditions = []
+    if start:
+        conditions += [MetricORM.year >= start[0], period >= tuple_(*start)]
+    if end:
+        conditions += [MetricORM.year <= end[0], period <= tuple_(*end)]
+    return conditions
+
+
+async def stream_metric_chunks(stmt):
+    """Yield lists of rows from a server-side cursor, EXPORT_CHUNK_SIZE at a time"""
+    async with AsyncSessionLocal() as session:
+        result = await session.stream(stmt.execution_options(yield_per=EXPORT_CHUNK_SIZE))
+        async for chunk in result.partitions():
+            yield chunk
+
+
+async def encode_csv(chunks, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    async for chunk in chunks:
+        writer.writerows((isoformat(v) if isinstance(v, datetime) else v for v in row) for row in chunk)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+async def encode_ndjson(chunks, columns):
+    async for chunk in chunks:
+        yield b''.join(dumps(dict(zip(columns, row))) + b'\n' for row in chunk)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands written bytes back to the caller instead of keeping them"""
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self) -> bytes:
+        data, self.parts = b''.join(self.parts), []
+        return data
+
+
+async def encode_parquet(chunks, columns):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("id", pa.string()), ("district_id", pa.string()), ("state", pa.string()), ("year", pa.int32()), ("month", pa.int32()),
+        ("total_job_days", pa.float64()), ("target_job_days", pa.float64()), ("households_covered", pa.int64()),
+        ("wages_paid", pa.float64()), ("performance_index", pa.float64()), ("timestamp", pa.timestamp('us', tz='UTC')),
+    ])
+    sink = _ChunkSink()
+    # One row group per chunk, flushed to the client as soon as it is written
+    with pq.ParquetWriter(sink, schema, compression='zstd') as writer:
+        async for chunk in chunks:
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(col, type=schema.field(name).type) for name, col in zip(columns, zip(*chunk))],
+                schema=schema,
+            ))
+            yield sink.drain()
+    yield sink.drain()
+
+
+# Metric history
+HISTORY_BUCKET_MONTHS = {"month": 1, "quarter": 3, "fin_year": 12}
+HISTORY_DEFAULT_LIMIT = 180  # 15 years of months in one page
+HISTORY_MAX_LIMIT = 360
+
+
+def history_bucket_start(bucket: str):
+    """SQL (year, month) of the first month of each metrics row's quarter or financial year"""
+    if bucket == "quarter":
+        return MetricORM.year, (MetricORM.month - 1) // 3 * 3 + 1
+    # Financial year runs April-March
+    return MetricORM.year - case((MetricORM.month < 4, 1), else_=0), literal(4, Integer)
+
+
+def history_aggregates(monthly, fields):
+    """Per-bucket aggregate of each requested field over a subquery of monthly rows"""
+    aggregates = {
+        "total_job_days": func.sum(monthly.c.total_job_days),
+        "target_job_days": func.sum(monthly.c.target_job_days),
+        # Households are counted per month, so a sum would count the same households repeatedly
+        "households_covered": func.max(monthly.c.households_covered),
+        "wages_paid": func.sum(monthly.c.wages_paid),
+        "performance_index": func.coalesce(
+            func.sum(monthly.c.total_job_days) * 100.0 / func.nullif(func.sum(monthly.c.target_job_days), 0),
+            func.avg(monthly.c.performance_index),
+        ),
+    }
+    return [aggregates[field].label(field) for field in fields]
+
+
+def history_label(bucket: str, year: int, month: int) -> str:
+    if bucket == "quarter":
+        return f"{year}-Q{(month - 1) // 3 + 1}"
+    if bucket == "fin_year":
+        return f"{year}-{year + 1}"
+    return f"{year:04d}-{month:02d}"
+
+
+# Shared query building blocks
+def performance_category(metric: Optional[dict]) -> str:
+    if not metric:
+        return "medium"
+    perf = metric.get("performance_index") or 0
+    if perf >= 90:
+        return "high"
+    if perf < 75:
+        return "low"
+    return "medium"
+
+
+def district_performance(district: dict, trend: List[dict]) -> dict:
+    """DistrictPerformance payload from a district and its metrics, newest first"""
+    latest_metric = trend[0] if trend else None
+    return {
+        "district": district,
+        "latest_metrics": latest_metric,
+        "trend": trend,
+        "performance_category": performance_category(latest_metric)
+    }
+
+
+# Data access strategies, chosen once at startup by detect_data_access()
+# Both return plain dicts in the District / MonthlyMetric shape, mapped in SQL.
+class OrmDataAccess:
+    """Current schema (DistrictORM / MetricORM)"""
+    legacy = False
+
+    district_columns = (
+        DistrictORM.id, DistrictORM.name_en, DistrictORM.name_kn, DistrictORM.feature,
+        func.coalesce(DistrictORM.coordinates, literal([15.3173, 75.7139], JSON)).label('coordinates'),
+        DistrictORM.state,
+    )
+    metric_columns = (
+        MetricORM.id, MetricORM.district_id, MetricORM.state, MetricORM.year, MetricORM.month, MetricORM.total_job_days,
+        MetricORM.target_job_days, MetricORM.households_covered, MetricORM.wages_paid,
+        MetricORM.performance_index, MetricORM.timestamp,
+    )
+
+    async def list_districts(self, session, district_ids: Optional[List[str]] = None,
+                             state: Optional[str] = None) -> List[dict]:
+        stmt = select(*self.district_columns)
+        if district_ids is not None:
+            stmt = stmt.where(DistrictORM.id.in_(district_ids))
+        if state is not None:
+            stmt = stmt.where(DistrictORM.state == state)
+        rows = (await session.execute(stmt)).mappings().all()
+        return [dict(r) for r in rows]
+
+    async def get_district(self, session, district_id: str) -> Optional[dict]:
+        row = (await session.execute(
+            select(*self.district_columns).where(DistrictORM.id == district_id)
+        )).mappings().first()
+        return dict(row) if row else None
+
+    async def metric_trend(self, session, district_id: str, limit: int) -> List[dict]:
+        rows = (await session.execute(
+            select(*self.metric_columns).where(MetricORM.district_id == district_id)
+            .order_by(desc(MetricORM.year), desc(MetricORM.month)).limit(limit)
+        )).mappings().all()
+        return [dict(r) for r in rows]
+
+    async def metric_trends(self, session, district_ids: Optional[List[str]], limit: int) -> Dict[str, List[dict]]:
+        """Newest `limit` metrics (newest first) for many districts in one windowed query"""
+        ranked = select(*self.metric_columns, func.row_number().over(
+            partition_by=MetricORM.district_id,
+            order_by=(desc(MetricORM.year), desc(MetricORM.month))
+        ).label('rn'))
+        if district_ids is not None:
+            ranked = ranked.where(MetricORM.district_id.in_(district_ids))
+        ranked = ranked.subquery('ranked_metrics')
+        stmt = select(*(ranked.c[c.key] for c in self.metric_columns)).where(ranked.c.rn <= limit) \
+            .order_by(ranked.c.district_id, ranked.c.rn)
+        trends = defaultdict(list)
+        for r in (await session.execute(stmt)).mappings():
+            trends[r['district_id']].append(dict(r))
+        return trends
+
+
+class LegacyDataAccess(OrmDataAccess):
+    """Older Postgres schema: districts(id int, name, name_kn, state, geojson) and
+    metrics(fin_year 'YYYY-YYYY', month text, persondays_central_liability, ...).
+    Its state column holds names rather than codes, so state filters are ignored here."""
+    legacy = True
+
+    DISTRICT_SQL = (
+        "SELECT id::text AS id, COALESCE(name, '') AS name_en, COALESCE(name_kn, '') AS name_kn, "
+        "COALESCE(state, '') AS feature, "
+        "CASE WHEN jsonb_typeof(to_jsonb(geojson)) = 'array' THEN to_jsonb(geojson) "
+        "ELSE '[15.3173, 75.7139]'::jsonb END AS coordinates, NULL AS state "
+        "FROM districts"
+    )
+    METRIC_COLUMNS_SQL = (
+        "id::text AS id, district_id::text AS district_id, NULL AS state, "
+        "CASE WHEN fin_year::text LIKE '%-%' THEN split_part(fin_year::text, '-', 1)::int "
+        "ELSE NULLIF(fin_year::text, '')::int END AS year, "
+        "CASE WHEN month::text ~ '^[0-9]+$' THEN month::int END AS month, "
+        "persondays_central_liability AS total_job_days, NULL::float AS target_job_days, "
+        "total_households_worked AS households_covered, wages::float AS wages_paid, "
+        "NULL::float AS performance_index, created_at AS timestamp"
+    )
+    METRIC_SQL = f"SELECT {METRIC_COLUMNS_SQL} FROM metrics WHERE district_id::text = :did ORDER BY created_at DESC LIMIT :limit"
+    TRENDS_SQL = (
+        f"SELECT * FROM (SELECT {METRIC_COLUMNS_SQL}, "
+        "row_number() OVER (PARTITION BY district_id ORDER BY created_at DESC) AS rn "
+        "FROM metrics WHERE :all_districts OR district_id::text = ANY(:ids)) ranked "
+        "WHERE rn <= :limit ORDER BY district_id, rn"
+    )
+
+    async def list_districts(self, session, district_ids: Optional[List[str]] = None,
+                             state: Optional[str] = None) -> List[dict]:
+        if district_ids is None:
+            rows = await session.execute(text(self.DISTRICT_SQL))
+        else:
+            rows = await session.execute(text(self.DISTRICT_SQL + " WHERE id::text = ANY(:ids)"), {"ids": district_ids})
+        return [dict(r) for r in rows.mappings().all()]
+
+    async def get_district(self, session, district_id: str) -> Optional[dict]:
+        row = (await session.execute(
+            text(self.DISTRICT_SQL + " WHERE id::text = :did"), {"did": district_id}
+        )).mappings().first()
+        return dict(row) if row else None
+
+    async def metric_trend(self, session, district_id: str, limit: int) -> List[dict]:
+        rows = (await session.execute(text(self.METRIC_SQL), {"did": district_id, "limit": limit})).mappings().all()
+        return [dict(r) for r in rows]
+
+    async def metric_trends(self, session, district_ids: Optional[List[str]], limit: int) -> Dict[str, List[dict]]:
+        params = {"all_districts": district_ids is None, "ids": district_ids or [], "limit": limit}
+        trends = defaultdict(list)
+        for r in (await session.execute(text(self.TRENDS_SQL), params)).mappings():
+            trends[r['district_id']].append({k: v for k, v in r.items() if k != 'rn'})
+        return trends
+
+
+data_access = OrmDataAccess()
+
+
+async def detect_data_access(conn):
+    """Inspect the catalog once and pick the strategy request handlers will use"""
+    global data_access
+    district_columns = await conn.run_sync(lambda c: {col['name'] for col in inspect(c).get_columns('districts')})
+    data_access = OrmDataAccess() if 'name_en' in district_columns else LegacyDataAccess()
+    logger.info(f"Using {type(data_access).__name__} for district/metric reads")
+
+
+def state_rollup_to_dict(r):
+    return {
+        "total_job_days": r.total_job_days or 0,
+        "total_households": r.total_households or 0,
+        "total_wages": r.total_wages or 0,
+        "avg_performance": round(r.avg_performance or 0, 2),
+        "best_district": r.best_district,
+        "worst_district": r.worst_district
+    }
+
+
+def parse_district_ids(ids: str) -> Optional[List[str]]:
+    """Ids of a comma-separated list, or None for all districts"""
+    return None if ids.strip().lower() == "all" else [i.strip() for i in ids.split(',') if i.strip()]
 
 # API Routes
 @api_router.get("/")
@@ -218,219 +1424,351 @@ async def root():
     return {"message": "MGNREGA Karnataka Dashboard API", "version": "1.0"}
 
 @api_router.get("/districts", response_model=List[District])
-async def get_districts():
-    """Get all Karnataka districts"""
+@cached_response
+async def get_districts(state: str = Query(DEFAULT_STATE, pattern=STATE_PATTERN)):
+    """Get all districts of a state"""
     async with AsyncSessionLocal() as session:
-        # Try new schema first (ORM). If the database has an older schema, fall back to a compatibility query.
-        try:
-            res = await session.execute(select(DistrictORM))
-            rows = res.scalars().all()
-            if rows:
-                return [
-                    {
-                        "id": r.id,
-                        "name_en": r.name_en,
-                        "name_kn": r.name_kn,
-                        "feature": r.feature,
-                        "coordinates": r.coordinates or [15.3173, 75.7139]
-                    }
-                    for r in rows
-                ]
-        except Exception:
-            # fall through to compatibility mode
-            pass
-
-        # Compatibility: older schema uses columns like id (int), name, name_kn, geojson
-        try:
-            q = text("SELECT id::text AS id, name AS name_en, name_kn, state, geojson FROM districts")
-            res = await session.execute(q)
-            rows = res.fetchall()
-            return [
-                {
-                    "id": r[0],
-                    "name_en": r[1] or "",
-                    "name_kn": r[2] or "",
-                    "feature": r[3] or "",
-                    "coordinates": (r[4] and (r[4] if isinstance(r[4], list) else [15.3173, 75.7139])) or [15.3173, 75.7139]
-                }
-                for r in rows
-            ]
-        except Exception:
-            return []
+        return await data_access.list_districts(session, state=state)
+
+@api_router.get("/districts/performance", response_model=List[DistrictPerformance])
+@conditional_get(district_ids=lambda kwargs: parse_district_ids(kwargs['ids']))
+@cached_response
+async def get_districts_performance(ids: str = "all", months: int = Query(6, ge=1, le=120),
+                                    state: str = Query(DEFAULT_STATE, pattern=STATE_PATTERN)):
+    """Get performance for many districts at once: ids is a comma-separated list or "all" (the state's districts)"""
+    district_ids = parse_district_ids(ids)
+    async with AsyncSessionLocal() as session:
+        if district_ids is None:
+            districts = await data_access.list_districts(session, state=state)
+            trend_ids = None if data_access.legacy else [d["id"] for d in districts]
+        else:
+            districts = await data_access.list_districts(session, district_ids)
+            trend_ids = district_ids
+        trends = await data_access.metric_trends(session, trend_ids, months)
+
+    if district_ids is not None:
+        order = {did: i for i, did in enumerate(district_ids)}
+        districts.sort(key=lambda d: order[d["id"]])
+    return [district_performance(d, trends.get(d["id"], [])) for d in districts]
 
 @api_router.get("/districts/{district_id}", response_model=DistrictPerformance)
+@conditional_get(per_district=True)
+@cached_response
 async def get_district_performance(district_id: str):
     """Get detailed performance for a specific district"""
-    # Get district info
     async with AsyncSessionLocal() as session:
-        # Try new schema first
-        try:
-            res = await session.execute(select(DistrictORM).where(DistrictORM.id == district_id))
-            district_row = res.scalars().first()
-        except Exception:
-            district_row = None
-
-        if district_row:
-            # Latest metric
-            res_latest = await session.execute(
-                select(MetricORM).where(MetricORM.district_id == district_id).order_by(desc(MetricORM.year), desc(MetricORM.month)).limit(1)
-            )
-            latest_metric = res_latest.scalars().first()
-
-            # Trend (last 6 months)
-            res_trend = await session.execute(
-                select(MetricORM).where(MetricORM.district_id == district_id).order_by(desc(MetricORM.year), desc(MetricORM.month)).limit(6)
-            )
-            trend_rows = res_trend.scalars().all()
-        else:
-            # Compatibility with older schema
-            # district_id in old schema may be integer; convert
-            try:
-                q = text("SELECT id::text, name, name_kn, state, geojson FROM districts WHERE id::text = :did")
-                res = await session.execute(q, {"did": district_id})
-                r = res.fetchone()
-                if not r:
-                    raise HTTPException(status_code=404, detail="District not found")
-                district_row = type("D", (), {"id": r[0], "name_en": r[1], "name_kn": r[2], "feature": r[3], "coordinates": r[4]})()
-            except Exception:
-                raise HTTPException(status_code=404, detail="District not found")
-
-            # Fetch latest and trend from old metrics table and map columns
-            try:
-                q_latest = text("SELECT id::text, district_id::text, fin_year, month, persondays_central_liability AS total_job_days, NULL AS target_job_days, total_households_worked AS households_covered, wages AS wages_paid, NULL AS performance_index, created_at AS timestamp FROM metrics WHERE district_id::text = :did ORDER BY created_at DESC LIMIT 1")
-                res_latest = await session.execute(q_latest, {"did": district_id})
-                latest_metric = res_latest.fetchone()
-
-                q_trend = text("SELECT id::text, district_id::text, fin_year, month, persondays_central_liability AS total_job_days, NULL AS target_job_days, total_households_worked AS households_covered, wages AS wages_paid, NULL AS performance_index, created_at AS timestamp FROM metrics WHERE district_id::text = :did ORDER BY created_at DESC LIMIT 6")
-                res_trend = await session.execute(q_trend, {"did": district_id})
-                trend_rows = res_trend.fetchall()
-            except Exception:
-                latest_metric = None
-                trend_rows = []
-
-        def metric_to_dict(m):
-            if not m:
-                return None
-            # m can be an ORM object or a SQL row/tuple
-            if hasattr(m, "id"):
-                return {
-                    "id": m.id,
-                    "district_id": m.district_id,
-                    "year": getattr(m, "year", None),
-                    "month": getattr(m, "month", None),
-                    "total_job_days": getattr(m, "total_job_days", None),
-                    "target_job_days": getattr(m, "target_job_days", None),
-                    "households_covered": getattr(m, "households_covered", None),
-                    "wages_paid": getattr(m, "wages_paid", None),
-                    "performance_index": getattr(m, "performance_index", None),
-                    "timestamp": getattr(m, "timestamp", None)
-                }
-            else:
-                # assume tuple-like from raw SQL
-                # mapping follows q_latest/q_trend select order
-                return {
-                    "id": m[0],
-                    "district_id": m[1],
-                    "year": (int(m[2].split('-')[0]) if m[2] and isinstance(m[2], str) and '-' in m[2] else (int(m[2]) if m[2] else None)),
-                    "month": (int(m[3]) if m[3] and str(m[3]).isdigit() else None),
-                    "total_job_days": m[4],
-                    "target_job_days": m[5],
-                    "households_covered": m[6],
-                    "wages_paid": float(m[7]) if m[7] is not None else None,
-                    "performance_index": m[8],
-                    "timestamp": m[9]
-                }
+        district = await data_access.get_district(session, district_id)
+        if not district:
+            raise HTTPException(status_code=404, detail="District not found")
+        # Trend (last 6 months); its first row is the latest metric
+        trend = await data_access.metric_trend(session, district_id, 6)
 
-        # Determine performance category
-        performance_category = "medium"
-        if latest_metric:
-            perf = latest_metric.performance_index or 0
-            if perf >= 90:
-                performance_category = "high"
-            elif perf < 75:
-                performance_category = "low"
+    return district_performance(district, trend)
+
+# History parameters are parsed in dependencies, so invalid ones are rejected before conditional_get can answer 304
+def year_month_param(name: str, description: str):
+    def dependency(value: Optional[str] = Query(None, alias=name, description=description)):
+        return parse_year_month(value, name)
+    return dependency
+
+
+def history_fields(fields: Optional[str] = Query(None, description="comma-separated metric fields (default: all)")):
+    if fields is None:
+        return None
+    selected = tuple(f.strip() for f in fields.split(',') if f.strip())
+    if not selected or not set(selected) <= set(METRIC_FIELDS):
+        raise HTTPException(status_code=422, detail=f"fields must be a comma-separated subset of {','.join(METRIC_FIELDS)}")
+    return selected
 
-        return {
-            "district": {
-                "id": district_row.id,
-                "name_en": district_row.name_en,
-                "name_kn": district_row.name_kn,
-                "feature": district_row.feature,
-                "coordinates": district_row.coordinates or [15.3173, 75.7139]
-            },
-            "latest_metrics": metric_to_dict(latest_metric),
-            "trend": [metric_to_dict(m) for m in trend_rows],
-            "performance_category": performance_category
-        }
+
+@api_router.get("/districts/{district_id}/history", response_model=MetricHistory)
+@conditional_get(per_district=True)
+@cached_response
+async def get_district_history(
+    district_id: str,
+    start: Optional[tuple] = Depends(year_month_param("from", "YYYY-MM, inclusive")),
+    end: Optional[tuple] = Depends(year_month_param("to", "YYYY-MM, inclusive")),
+    bucket: str = Query("month", pattern="^(month|quarter|fin_year)$"),
+    fields: Optional[tuple] = Depends(history_fields),
+    after: Optional[tuple] = Depends(year_month_param("cursor", "next_cursor of the previous page")),
+    limit: int = Query(HISTORY_DEFAULT_LIMIT, ge=1, le=HISTORY_MAX_LIMIT, description="buckets per page"),
+):
+    """Metrics history of a district over any range, oldest first, bucketed by month, quarter or financial year"""
+    if data_access.legacy:
+        raise HTTPException(status_code=501, detail="History is not available on the legacy schema")
+    selected = list(METRIC_FIELDS) if fields is None else list(fields)
+
+    conditions = [MetricORM.district_id == district_id, *period_conditions(start, end)]
+    if after:
+        # Keyset: the cursor is the first month of the last bucket sent, so resume at the following bucket
+        year, month_index = divmod(after[0] * 12 + after[1] - 1 + HISTORY_BUCKET_MONTHS[bucket], 12)
+        conditions += period_conditions((year, month_index + 1))
+
+    if bucket == "month":
+        columns = OrmDataAccess.metric_columns if fields is None else (
+            MetricORM.district_id, MetricORM.year, MetricORM.month, *(getattr(MetricORM, f) for f in selected))
+        stmt = select(*columns).where(*conditions).order_by(MetricORM.year, MetricORM.month)
+    else:
+        bucket_year, bucket_month = history_bucket_start(bucket)
+        monthly = select(
+            bucket_year.label('year'), bucket_month.label('month'), *(getattr(MetricORM, f) for f in METRIC_FIELDS)
+        ).where(*conditions).subquery('monthly')
+        stmt = select(monthly.c.year, monthly.c.month, func.count().label('months'), *history_aggregates(monthly, selected)) \
+            .group_by(monthly.c.year, monthly.c.month).order_by(monthly.c.year, monthly.c.month)
+
+    async with AsyncSessionLocal() as session:
+        # One extra row tells whether another page follows
+        rows = (await session.execute(stmt.limit(limit + 1))).mappings().all()
+        if not rows and (await session.execute(select(DistrictORM.id).where(DistrictORM.id == district_id))).first() is None:
+            raise HTTPException(status_code=404, detail="District not found")
+
+    items = [dict(r) for r in rows[:limit]]
+    if bucket != "month":
+        for item in items:
+            item["label"] = history_label(bucket, item["year"], item["month"])
+            if item.get("performance_index") is not None:
+                item["performance_index"] = round(item["performance_index"], 2)
+    next_cursor = history_label("month", items[-1]["year"], items[-1]["month"]) if len(rows) > limit else None
+    return {"district_id": district_id, "bucket": bucket, "fields": selected, "items": items, "next_cursor": next_cursor}
 
 @api_router.get("/metrics/state", response_model=StateStatistics)
-async def get_state_statistics():
-    """Get state-level aggregated statistics"""
-    # Get all latest metrics for each district
-    # Fetch latest metric per district by iterating districts (small state - acceptable)
+@conditional_get()
+@cached_response
+async def get_state_statistics(year: Optional[int] = None, month: Optional[int] = None,
+                               state: str = Query(DEFAULT_STATE, pattern=STATE_PATTERN)):
+    """Get state-level aggregated statistics (latest month per district, or a given year/month)"""
+    if data_access.legacy:
+        raise HTTPException(status_code=501, detail="State statistics are not available on the legacy schema")
+    if year is not None or month is not None:
+        if year is None or month is None:
+            raise HTTPException(status_code=422, detail="year and month must be given together")
+        async with AsyncSessionLocal() as session:
+            rollup = await session.get(StateRollupORM, (state, year, month))
+        if not rollup:
+            raise HTTPException(status_code=404, detail="No metrics for that month")
+        return state_rollup_to_dict(rollup)
+
+    # Totals, best and worst district over the flagged newest rollup row of each district
+    latest = select(DistrictRollupORM).where(
+        DistrictRollupORM.state == state, DistrictRollupORM.is_latest == true()
+    ).cte('latest_metrics')
+    perf = func.coalesce(latest.c.performance_index, 0)
+    best_q = select(latest.c.district_id).order_by(desc(perf), latest.c.district_id).limit(1).scalar_subquery()
+    worst_q = select(latest.c.district_id).order_by(perf, latest.c.district_id).limit(1).scalar_subquery()
+    stmt = select(
+        func.coalesce(func.sum(latest.c.total_job_days), 0),
+        func.coalesce(func.sum(latest.c.households_covered), 0),
+        func.coalesce(func.sum(latest.c.wages_paid), 0),
+        func.coalesce(func.avg(perf), 0),
+        best_q,
+        worst_q,
+    ).select_from(latest)
+
     async with AsyncSessionLocal() as session:
-        districts = (await session.execute(select(DistrictORM.id))).scalars().all()
-
-        total_job_days = 0
-        total_households = 0
-        total_wages = 0
-        performances = []
-        district_performances = {}
-
-        for did in districts:
-            res_latest = await session.execute(
-                select(MetricORM).where(MetricORM.district_id == did).order_by(desc(MetricORM.year), desc(MetricORM.month)).limit(1)
-            )
-            m = res_latest.scalars().first()
-            if m:
-                total_job_days += m.total_job_days or 0
-                total_households += m.households_covered or 0
-                total_wages += m.wages_paid or 0
-                perf = m.performance_index or 0
-                performances.append(perf)
-                district_performances[did] = perf
-
-        avg_performance = sum(performances) / len(performances) if performances else 0
-
-        best_district = max(district_performances.items(), key=lambda x: x[1])[0] if district_performances else None
-        worst_district = min(district_performances.items(), key=lambda x: x[1])[0] if district_performances else None
+        row = (await session.execute(stmt)).one()
 
-        return {
-            "total_job_days": total_job_days,
-            "total_households": total_households,
-            "total_wages": total_wages,
-            "avg_performance": round(avg_performance, 2),
-            "best_district": best_district,
-            "worst_district": worst_district
-        }
+    total_job_days, total_households, total_wages, avg_performance, best_district, worst_district = row
+    return {
+        "total_job_days": total_job_days,
+        "total_households": total_households,
+        "total_wages": total_wages,
+        "avg_performance": round(avg_performance, 2),
+        "best_district": best_district,
+        "worst_district": worst_district
+    }
+
+@api_router.get("/metrics/state/yoy", response_model=StateYearOverYear)
+@conditional_get()
+@cached_response
+async def get_state_year_over_year(year: Optional[int] = None, month: Optional[int] = None,
+                                   state: str = Query(DEFAULT_STATE, pattern=STATE_PATTERN)):
+    """Compare state totals for a month (default: newest in the rollup) with the same month a year earlier"""
+    if data_access.legacy:
+        raise HTTPException(status_code=501, detail="State statistics are not available on the legacy schema")
+    async with AsyncSessionLocal() as session:
+        if year is None or month is None:
+            newest = (await session.execute(
+                select(StateRollupORM.year, StateRollupORM.month).where(StateRollupORM.state == state)
+                .order_by(desc(StateRollupORM.year), desc(StateRollupORM.month)).limit(1)
+            )).first()
+            if not newest:
+                raise HTTPException(status_code=404, detail="No metrics available")
+            year, month = newest
+        rows = (await session.execute(select(StateRollupORM).where(
+            StateRollupORM.state == state, StateRollupORM.month == month, StateRollupORM.year.in_([year, year - 1])
+        ))).scalars().all()
+
+    by_year = {r.year: state_rollup_to_dict(r) for r in rows}
+    current, previous = by_year.get(year), by_year.get(year - 1)
+    if not current:
+        raise HTTPException(status_code=404, detail="No metrics for that month")
+
+    change_pct = {}
+    if previous:
+        for field in ("total_job_days", "total_households", "total_wages", "avg_performance"):
+            change_pct[field] = round((current[field] - previous[field]) / previous[field] * 100, 2) if previous[field] else None
+    return {"year": year, "month": month, "current": current, "previous": previous, "change_pct": change_pct}
 
 @api_router.get("/metrics/comparison")
-async def get_comparison_data():
-    """Get comparison data for all districts"""
-    # Get latest metrics for each district
+@conditional_get()
+@cached_response
+async def get_comparison_data(state: str = Query(DEFAULT_STATE, pattern=STATE_PATTERN)):
+    """Get comparison data for all districts of a state"""
+    # Served from the state's in-memory columnar snapshot (districts without metrics keep None values)
+    snapshot = await analytics_store(state).get()
+    perf = snapshot.latest_values('performance_index')
+    job_days = snapshot.latest_values('total_job_days')
+    households = snapshot.latest_values('households_covered')
+
     async with AsyncSessionLocal() as session:
-        districts_map = {d['id']: d for d in KARNATAKA_DISTRICTS}
-        comparison_data = []
-        district_ids = (await session.execute(select(DistrictORM.id))).scalars().all()
-        for did in district_ids:
-            res_latest = await session.execute(
-                select(MetricORM).where(MetricORM.district_id == did).order_by(desc(MetricORM.year), desc(MetricORM.month)).limit(1)
-            )
-            m = res_latest.scalars().first()
-            district_info = districts_map.get(did, {})
-            comparison_data.append({
-                "district_id": did,
-                "name_en": district_info.get('name_en', did),
-                "name_kn": district_info.get('name_kn', did),
-                "performance_index": m.performance_index if m else None,
-                "total_job_days": m.total_job_days if m else None,
-                "households_covered": m.households_covered if m else None
-            })
-
-        return comparison_data
+        districts_map = {d['id']: d for d in await data_access.list_districts(session, state=state)}
+    comparison_data = []
+    for i, did in enumerate(snapshot.district_ids):
+        district_info = districts_map.get(did, {})
+        comparison_data.append({
+            "district_id": did,
+            "name_en": district_info.get('name_en', did),
+            "name_kn": district_info.get('name_kn', did),
+            "performance_index": perf[i],
+            "total_job_days": job_days[i],
+            "households_covered": households[i]
+        })
+
+    return comparison_data
+
+@api_router.get("/analytics/rankings")
+@conditional_get()
+@cached_response
+async def get_rankings(field: str = Query("performance_index", pattern=METRIC_FIELD_PATTERN),
+                       order: str = Query("desc", pattern="^(asc|desc)$"),
+                       limit: Optional[int] = Query(None, ge=1),
+                       state: str = Query(DEFAULT_STATE, pattern=STATE_PATTERN)):
+    """A state's districts ranked by the newest value of a metric field"""
+    snapshot = await analytics_store(state).get()
+    ranked = snapshot.rankings(field, descending=order == "desc")[:limit]
+    return [{"rank": rank, "district_id": did, field: value} for did, value, rank in ranked]
+
+@api_router.get("/analytics/percentiles")
+@conditional_get()
+@cached_response
+async def get_percentiles(field: str = Query("performance_index", pattern=METRIC_FIELD_PATTERN),
+                          q: str = "10,25,50,75,90",
+                          state: str = Query(DEFAULT_STATE, pattern=STATE_PATTERN)):
+    """Percentiles of the newest value of a metric field across a state's districts"""
+    try:
+        qs = [float(x) for x in q.split(',')]
+    except ValueError:
+        raise HTTPException(status_code=422, detail="q must be comma-separated numbers")
+    if not all(0 <= x <= 100 for x in qs):
+        raise HTTPException(status_code=422, detail="percentiles must be between 0 and 100")
+    snapshot = await analytics_store(state).get()
+    return {"field": field, "percentiles": snapshot.percentiles(field, qs)}
+
+@api_router.get("/analytics/deltas")
+@conditional_get()
+@cached_response
+async def get_month_over_month(field: str = Query("performance_index", pattern=METRIC_FIELD_PATTERN),
+                               state: str = Query(DEFAULT_STATE, pattern=STATE_PATTERN)):
+    """Change in a metric field from the previous calendar month, per district of a state"""
+    snapshot = await analytics_store(state).get()
+    current = snapshot.latest_values(field)
+    deltas = snapshot.month_over_month_values(field)
+    return [
+        {"district_id": did, field: current[i], "change": deltas[i]}
+        for i, did in enumerate(snapshot.district_ids)
+    ]
+
+@api_router.get("/analytics/summary")
+@conditional_get()
+@cached_response
+async def get_analytics_summary(state: str = Query(DEFAULT_STATE, pattern=STATE_PATTERN)):
+    """State totals, performance percentiles and category banding for every district of a state"""
+    snapshot = await analytics_store(state).get()
+    return {
+        "state": snapshot.state_totals(),
+        "performance_percentiles": snapshot.percentiles('performance_index', [10, 25, 50, 75, 90]),
+        "category_counts": snapshot.category_counts(),
+        "categories": dict(zip(snapshot.district_ids.tolist(), snapshot.categories().tolist())),
+    }
+
+@api_router.get("/metrics/export")
+async def export_metrics(
+    format: str = Query("csv", pattern="^(csv|ndjson|parquet)$"),
+    from_: Optional[str] = Query(None, alias="from", description="YYYY-MM, inclusive"),
+    to: Optional[str] = Query(None, description="YYYY-MM, inclusive"),
+    district: Optional[str] = Query(None, description="comma-separated district ids"),
+    state: Optional[str] = Query(None, pattern=STATE_PATTERN, description="only this state's districts"),
+):
+    """Stream the full metrics history; memory use is bounded by EXPORT_CHUNK_SIZE rows"""
+    if data_access.legacy:
+        raise HTTPException(status_code=501, detail="Export is not available on the legacy schema")
+    if format == "parquet" and importlib.util.find_spec('pyarrow') is None:
+        raise HTTPException(status_code=501, detail="Parquet export requires pyarrow")
+
+    stmt = select(*OrmDataAccess.metric_columns).order_by(MetricORM.district_id, MetricORM.year, MetricORM.month) \
+        .where(*period_conditions(parse_year_month(from_, "from"), parse_year_month(to, "to")))
+    if state:
+        stmt = stmt.where(MetricORM.state == state)
+    if district:
+        stmt = stmt.where(MetricORM.district_id.in_([d.strip() for d in district.split(',') if d.strip()]))
+
+    columns = [c.key for c in OrmDataAccess.metric_columns]
+    encoder = {"csv": encode_csv, "ndjson": encode_ndjson, "parquet": encode_parquet}[format]
+    return StreamingResponse(
+        encoder(stream_metric_chunks(stmt), columns),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="mgnrega_metrics.{format}"'},
+    )
+
+@api_router.get("/stream/metrics")
+async def stream_metrics(state: str = Query(DEFAULT_STATE, pattern=STATE_PATTERN)):
+    """Server-Sent Events: a full snapshot of a state on connect, then diffs of changed districts and state totals"""
+    broadcaster = broadcaster_for(state)
+    subscriber = broadcaster.subscribe()
+    try:
+        initial = await broadcaster.snapshot_message()
+    except BaseException:
+        broadcaster.unsubscribe(subscriber)
+        raise
+
+    async def events():
+        try:
+            yield initial
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscriber.queue.get(), SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                if message is None:
+                    break
+                if subscriber.queue.empty():
+                    subscriber.overflows = 0
+                yield message
+        finally:
+            broadcaster.unsubscribe(subscriber)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@api_router.get("/stream/stats")
+async def get_stream_stats():
+    """Push channel subscriber and publication counters, per state with subscribers so far"""
+    return {state: broadcaster.stats() for state, broadcaster in _broadcasters.items()}
+
+@api_router.get("/cache/stats")
+async def get_cache_stats():
+    """Response cache counters for tuning RESPONSE_CACHE_TTL / RESPONSE_CACHE_MAXSIZE"""
+    return response_cache.stats()
+
+@api_router.get("/db/stats")
+async def get_db_stats():
+    """Connection pool usage, checkout waits and per-route latency / query counts"""
+    return db_stats.snapshot(engine.sync_engine.pool)
 
 # Include router
 app.include_router(api_router)
+app.add_middleware(DbMetricsMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -449,4 +1787,10 @@ logger = logging.getLogger(__name__)
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    for name in ('bootstrap_task', 'ingest_task'):
+        task = getattr(app.state, name, None)
+        if task:
+            task.cancel()
+    for broadcaster in _broadcasters.values():
+        await broadcaster.stop()
     await engine.dispose()
\ No newline at end of file
@@ -0,0 +1,90 @@
+"""Shared fixtures: the backend modules on sys.path and one app instance bootstrapped on a scratch database.
+
+Tests run against a throwaway SQLite file by default. Set TEST_DATABASE_URL to a disposable Postgres
+database (its public schema is dropped first) to also run the Postgres-only tests.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / 'backend'
+sys.path.insert(0, str(BACKEND_DIR))
+
+_scratch = tempfile.TemporaryDirectory(prefix='mgnrega-tests-')
+# server reads these at import time, so they are set before any test module imports it
+os.environ['DATABASE_URL'] = os.environ.get('TEST_DATABASE_URL') or f"sqlite+aiosqlite:///{_scratch.name}/test.db"
+os.environ['INGEST_INTERVAL_HOURS'] = '0'
+
+
+def reset_database(url: str):
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    async def reset():
+        engine = create_async_engine(url)
+        async with engine.begin() as conn:
+            await conn.execute(text("DROP SCHEMA public CASCADE"))
+            await conn.execute(text("CREATE SCHEMA public"))
+        await engine.dispose()
+
+    asyncio.run(reset())
+
+
+@pytest.fixture(scope='session')
+def client():
+    """TestClient for the app once the background bootstrap has seeded the Karnataka districts"""
+    import server
+    from fastapi.testclient import TestClient
+
+    if server.engine.dialect.name == 'postgresql':
+        reset_database(server.DATABASE_URL)
+    with TestClient(server.app) as c:
+        deadline = time.monotonic() + 60
+        while c.get('/readyz').status_code != 200:
+            assert time.monotonic() < deadline, c.get('/readyz').json()
+            time.sleep(0.05)
+        yield c
+
+
+@pytest.fixture
+def run(client):
+    """Run a coroutine function on the app's event loop, where the engine's connections live"""
+    return client.portal.call
+
+
+@pytest.fixture
+def postgres(client):
+    import server
+
+    if server.engine.dialect.name != 'postgresql':
+        pytest.skip("needs TEST_DATABASE_URL pointing at Postgres")
+
+
+@pytest.fixture(scope='module')
+def scratch_districts(client):
+    """Create throwaway districts with scratch_districts(ids, state); they are removed, with their metrics and
+    rollup rows, once the module's tests are done"""
+    import server
+    from benchmarks.bulk_load import cleanup
+    from sqlalchemy import insert
+
+    created = []
+
+    async def create(district_ids, state):
+        async with server.AsyncSessionLocal() as session:
+            await session.execute(insert(server.DistrictORM), [
+                {"id": d, "name_en": d, "name_kn": d, "feature": "test", "state": state} for d in district_ids])
+            await session.commit()
+
+    def scratch(district_ids, state):
+        client.portal.call(create, district_ids, state)
+        created.extend(district_ids)
+
+    yield scratch
+    if created:
+        client.portal.call(cleanup, created)
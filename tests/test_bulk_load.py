@@ -0,0 +1,25 @@
+"""Bulk loader row counts; on Postgres (TEST_DATABASE_URL) this exercises the COPY + merge path."""
+from sqlalchemy import func, select
+
+import server
+from bulk_load import load_metric_rows
+
+DISTRICT_IDS = ["BLK0001", "BLK0002", "BLK0003"]
+MONTHS = 24
+
+
+async def metric_count():
+    async with server.AsyncSessionLocal() as session:
+        return (await session.execute(select(func.count()).select_from(server.MetricORM)
+                                      .where(server.MetricORM.district_id.in_(DISTRICT_IDS)))).scalar_one()
+
+
+def test_multi_batch_load_keeps_every_row(scratch_districts, run):
+    scratch_districts(DISTRICT_IDS, "ZZ")
+    rows = list(server.mock_metric_rows(DISTRICT_IDS, MONTHS))
+    assert run(load_metric_rows, rows, 10) == len(rows)
+    assert run(metric_count) == len(rows)
+
+    # Reloading the same months updates in place, batch after batch
+    assert run(load_metric_rows, list(server.mock_metric_rows(DISTRICT_IDS, MONTHS)), 10) == len(rows)
+    assert run(metric_count) == len(rows)
@@ -0,0 +1,68 @@
+from datetime import datetime, timezone
+
+import pytest
+from starlette.requests import Request
+
+from server import not_modified
+
+ETAG = 'W/"abc123"'
+LAST_MODIFIED = datetime(2025, 5, 20, 17, 51, 55, 123456, tzinfo=timezone.utc)
+
+
+def request(**headers) -> Request:
+    raw = [(name.replace('_', '-').encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+
+@pytest.mark.parametrize("if_none_match,expected", [
+    ('W/"abc123"', True),
+    ('"abc123"', True),  # weak comparison ignores the W/ prefix
+    ('"other", W/"abc123"', True),
+    ('*', True),
+    ('"other"', False),
+])
+def test_if_none_match(if_none_match, expected):
+    assert not_modified(request(if_none_match=if_none_match), ETAG, LAST_MODIFIED) is expected
+
+
+@pytest.mark.parametrize("if_modified_since,expected", [
+    ("Tue, 20 May 2025 17:51:55 GMT", True),  # HTTP dates have no sub-second part
+    ("Wed, 21 May 2025 00:00:00 GMT", True),
+    ("Tue, 20 May 2025 17:51:54 GMT", False),
+    ("not a date", False),
+])
+def test_if_modified_since(if_modified_since, expected):
+    assert not_modified(request(if_modified_since=if_modified_since), ETAG, LAST_MODIFIED) is expected
+
+
+def test_if_none_match_takes_precedence():
+    headers = {"if_none_match": '"other"', "if_modified_since": "Wed, 21 May 2025 00:00:00 GMT"}
+    assert not not_modified(request(**headers), ETAG, LAST_MODIFIED)
+
+
+def test_no_validators_or_no_timestamp():
+    assert not not_modified(request(), ETAG, LAST_MODIFIED)
+    assert not not_modified(request(if_modified_since="Wed, 21 May 2025 00:00:00 GMT"), ETAG, None)
+
+
+def test_revalidation_returns_304_without_body(client):
+    first = client.get("/api/metrics/state")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    again = client.get("/api/metrics/state", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["etag"] == etag
+
+
+
+def test_unknown_district_is_404_not_304(client):
+    for path in ("/api/districts/NOPE", "/api/districts/NOPE/history"):
+        assert client.get(path, headers={"If-None-Match": "*"}).status_code == 404
+
+
+def test_invalid_history_parameters_are_422_not_304(client):
+    etag = client.get("/api/districts/KA01/history").headers["etag"]
+    for params in ({"fields": "bogus"}, {"from": "2024-13"}, {"cursor": "soon"}):
+        r = client.get("/api/districts/KA01/history", params=params, headers={"If-None-Match": etag})
+        assert r.status_code == 422, params
@@ -0,0 +1,62 @@
+"""Streaming export: heap use must not grow with the rows exported, and timestamps match the JSON API's."""
+import csv
+import io
+import json
+import tracemalloc
+
+import pytest
+from sqlalchemy import select
+
+import server
+from bulk_load import load_metric_rows
+
+SMALL = [f"EXP{i:04d}" for i in range(2)]
+LARGE = [f"EXP{i:04d}" for i in range(2, 42)]
+MONTHS = 120
+
+
+@pytest.fixture(scope="module")
+def exported_districts(scratch_districts, client):
+    scratch_districts(SMALL + LARGE, "ZZ")
+    client.portal.call(load_metric_rows, server.mock_metric_rows(SMALL + LARGE, MONTHS))
+
+
+async def export_peak(encoder, district_ids):
+    """Bytes exported and the traced heap peak while streaming them"""
+    stmt = select(*server.OrmDataAccess.metric_columns).where(server.MetricORM.district_id.in_(district_ids)) \
+        .order_by(server.MetricORM.district_id, server.MetricORM.year, server.MetricORM.month)
+    columns = [c.key for c in server.OrmDataAccess.metric_columns]
+    size = 0
+    tracemalloc.start()
+    try:
+        async for part in encoder(server.stream_metric_chunks(stmt), columns):
+            size += len(part)
+        return size, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.parametrize("encoder", [server.encode_csv, server.encode_ndjson])
+def test_export_memory_is_bounded_by_chunk_size(exported_districts, run, monkeypatch, encoder):
+    monkeypatch.setattr(server, "EXPORT_CHUNK_SIZE", 100)
+    run(export_peak, encoder, SMALL)  # warm statement and type caches
+    # tracemalloc also sees other tasks on the server loop, so keep each size's quietest run
+    small_size, small_peak = min((run(export_peak, encoder, SMALL) for _ in range(3)), key=lambda r: r[1])
+    large_size, large_peak = min((run(export_peak, encoder, LARGE) for _ in range(3)), key=lambda r: r[1])
+    assert large_size > 15 * small_size
+    # 20x the rows, but the same chunk size: the peak may wobble, not scale
+    assert large_peak < 2 * small_peak
+
+
+def test_export_timestamps_match_json_api(exported_districts, client):
+    ndjson = client.get("/api/metrics/export", params={"format": "ndjson", "district": SMALL[0]})
+    csv_export = client.get("/api/metrics/export", params={"format": "csv", "district": SMALL[0]})
+    history = client.get(f"/api/districts/{SMALL[0]}")
+    assert ndjson.status_code == csv_export.status_code == history.status_code == 200
+
+    rows = [json.loads(line) for line in ndjson.text.splitlines()]
+    assert len(rows) == MONTHS
+    newest = max(rows, key=lambda r: (r["year"], r["month"]))
+    assert newest["timestamp"] == history.json()["latest_metrics"]["timestamp"]
+    csv_rows = list(csv.DictReader(io.StringIO(csv_export.text)))
+    assert [r["timestamp"] for r in csv_rows] == [r["timestamp"] for r in rows]
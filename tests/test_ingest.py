@@ -0,0 +1,86 @@
+import json
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+
+import ingest
+import server
+
+
+def record(district="BELAGAVI", month="Jan", fin_year="2019-2020", **values):
+    return {
+        "district_name": district, "month": month, "fin_year": fin_year,
+        "Persondays_of_Central_Liability_so_far": "90000", "Approved_Labour_Budget": "120000",
+        "Total_Households_Worked": "4321", "Wages": "1500000.5", **values,
+    }
+
+
+def test_normalize_record_maps_aliases_and_financial_year():
+    row = ingest.normalize_record(record())
+    assert row == {
+        "district_id": "KA04",  # Belagavi is listed as Belgaum
+        "year": 2020,  # January belongs to the second calendar year of FY 2019-2020
+        "month": 1,
+        "total_job_days": 90000.0,
+        "target_job_days": 120000.0,
+        "households_covered": 4321,
+        "wages_paid": 1500000.5,
+        "performance_index": 75.0,
+    }
+    assert ingest.normalize_record(record(month="April"))["year"] == 2019
+    assert ingest.normalize_record(record(district=" mysore "))["district_id"] == "KA22"
+
+
+@pytest.mark.parametrize("bad", [
+    {"district_name": "NOWHERE"},
+    {"month": "Smarch"},
+    {"fin_year": "2019"},
+    {"fin_year": "abc-def"},
+    {"fin_year": "-2020"},
+])
+def test_normalize_record_rejects_unplaceable_records(bad):
+    assert ingest.normalize_record(record(**bad)) is None
+
+
+def test_normalize_record_tolerates_bad_numbers():
+    row = ingest.normalize_record(record(Approved_Labour_Budget="", Wages="n/a", Total_Households_Worked=None))
+    assert (row["target_job_days"], row["wages_paid"], row["households_covered"]) == (0.0, 0.0, 0)
+    assert row["performance_index"] == 0.0
+
+
+def write_pages(directory, records, page_size):
+    for offset in range(0, len(records), page_size):
+        page = {"total": len(records), "offset": offset, "records": records[offset:offset + page_size]}
+        (directory / f"offset_{offset:08d}.json").write_text(json.dumps(page))
+
+
+def test_replay_app_serves_recorded_pages(tmp_path):
+    write_pages(tmp_path, [record()] * 3, 2)
+    with TestClient(ingest.replay_app(tmp_path)) as stand_in:
+        assert len(stand_in.get("/resource", params={"offset": 2}).json()["records"]) == 1
+        # Offsets that were never recorded answer like the real API past the end
+        assert stand_in.get("/resource", params={"offset": 40}).json() == {"total": 3, "offset": 40, "records": []}
+
+
+def test_ingest_replayed_pages(client, run, tmp_path, monkeypatch):
+    districts = ["BAGALKOTE", "BELAGAVI", "MYSURU", "KALABURAGI", "UNKNOWN"]
+    months = ["Apr", "May", "Jun", "Jul", "Aug"]
+    records = [record(district=d, month=m, fin_year="2018-2019") for d in districts for m in months]
+    write_pages(tmp_path, records, 10)
+    monkeypatch.setattr(ingest, "INGEST_PAGE_SIZE", 10)
+    monkeypatch.setattr(ingest, "INGEST_BATCH_SIZE", 7)  # several bulk-load batches per write
+    monkeypatch.setattr(ingest, "INGEST_RATE_LIMIT", 0)
+
+    transport = httpx.ASGITransport(app=ingest.replay_app(tmp_path))
+    written = run(ingest.ingest, "http://replay", transport)
+
+    async def count_rows():
+        async with server.AsyncSessionLocal() as session:
+            return (await session.execute(
+                select(func.count()).select_from(server.MetricORM).where(server.MetricORM.year == 2018)
+            )).scalar_one()
+
+    assert written == 20  # the UNKNOWN district's records are skipped
+    assert run(count_rows) == 20
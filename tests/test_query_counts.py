@@ -0,0 +1,62 @@
+"""Queries issued per request, as attributed by DbMetricsMiddleware, must not grow with the district count."""
+import pytest
+from sqlalchemy import insert, select, text
+from sqlalchemy.exc import DBAPIError
+
+import server
+
+# Route, query parameters and the most queries one uncached request may issue
+ROUTES = [
+    ("/api/districts", {}, 1),
+    ("/api/districts/performance", {"months": 6}, 3),
+    ("/api/districts/{district_id}", {}, 3),
+    ("/api/metrics/state", {}, 2),
+    ("/api/metrics/state/yoy", {}, 3),
+    ("/api/metrics/comparison", {}, 5),
+    ("/api/analytics/summary", {}, 4),
+]
+
+
+def queries_per_request(client, template, params) -> int:
+    """Queries one uncached request issues: response cache, version tokens and analytics snapshots are cleared"""
+    server.on_metrics_written()
+    route = f"GET {template}"
+    before = server.db_stats.routes.get(route, {}).get("queries", 0)
+    r = client.get(template.replace("{district_id}", "KA01"), params=params)
+    assert r.status_code == 200, r.text
+    return server.db_stats.routes[route]["queries"] - before
+
+
+async def add_districts(count):
+    rows = server.seed_districts(count)
+    async with server.AsyncSessionLocal() as session:
+        existing = set((await session.execute(select(server.DistrictORM.id))).scalars().all())
+        added = [r for r in rows if r["id"] not in existing]
+        await session.execute(insert(server.DistrictORM), added)
+        await session.commit()
+    await server.generate_mock_metrics([r["id"] for r in added], 6)
+
+
+@pytest.mark.parametrize("template,params,limit", ROUTES)
+def test_queries_per_request(client, template, params, limit):
+    assert queries_per_request(client, template, params) <= limit
+
+
+def test_query_count_independent_of_district_count(client, run):
+    before = {template: queries_per_request(client, template, params) for template, params, _ in ROUTES}
+    run(add_districts, len(server.KARNATAKA_DISTRICTS) + 20)
+    assert len(client.get("/api/districts").json()) == len(server.KARNATAKA_DISTRICTS) + 20
+    after = {template: queries_per_request(client, template, params) for template, params, _ in ROUTES}
+    assert after == before
+
+
+def test_failed_query_is_counted_and_its_timer_cleared(client, run):
+    async def failing_query():
+        async with server.engine.connect() as conn:
+            queries = server.db_stats.queries
+            with pytest.raises(DBAPIError):
+                await conn.execute(text("SELECT * FROM no_such_table"))
+            info = (await conn.get_raw_connection()).info
+            return server.db_stats.queries - queries, info.get("query_start")
+
+    assert run(failing_query) == (1, [])
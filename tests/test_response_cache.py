@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+
+from server import ResponseCache
+
+
+def test_concurrent_misses_share_one_load():
+    cache = ResponseCache()
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def main():
+        return await asyncio.gather(*(cache.get_or_load("k", loader) for _ in range(500)))
+
+    assert asyncio.run(main()) == ["value"] * 500
+    assert calls == 1
+    assert (cache.misses, cache.coalesced, cache.hits) == (1, 499, 0)
+
+
+def test_hit_after_load():
+    cache = ResponseCache()
+
+    async def main():
+        await cache.get_or_load("k", lambda: asyncio.sleep(0, "first"))
+        return await cache.get_or_load("k", lambda: asyncio.sleep(0, "second"))
+
+    assert asyncio.run(main()) == "first"
+    assert (cache.misses, cache.hits) == (1, 1)
+
+
+def test_invalidate_during_load_does_not_store_stale_value():
+    cache = ResponseCache()
+
+    async def stale_loader():
+        cache.invalidate()  # a write lands while this load is in flight
+        return "stale"
+
+    async def main():
+        first = await cache.get_or_load("k", stale_loader)
+        second = await cache.get_or_load("k", lambda: asyncio.sleep(0, "fresh"))
+        return first, second
+
+    assert asyncio.run(main()) == ("stale", "fresh")
+    assert cache.misses == 2
+    assert cache.stats()["size"] == 1
+
+
+def test_invalidate_clears_entries():
+    cache = ResponseCache()
+
+    async def main():
+        await cache.get_or_load("k", lambda: asyncio.sleep(0, 1))
+        cache.invalidate()
+        return await cache.get_or_load("k", lambda: asyncio.sleep(0, 2))
+
+    assert asyncio.run(main()) == 2
+    assert cache.invalidations == 1
+
+
+def test_lru_eviction_and_ttl_expiry():
+    lru = ResponseCache(maxsize=2)
+    expiring = ResponseCache(ttl=0)
+
+    async def main():
+        for key in ("a", "b", "a", "c"):  # touching "a" makes "b" the least recently used
+            await lru.get_or_load(key, lambda: asyncio.sleep(0, key))
+        await expiring.get_or_load("k", lambda: asyncio.sleep(0, 1))
+        await expiring.get_or_load("k", lambda: asyncio.sleep(0, 2))
+
+    asyncio.run(main())
+    assert lru.evictions == 1
+    assert set(lru._entries) == {"a", "c"}
+    assert expiring.expirations == 1
+
+
+def test_failed_load_reaches_waiters_and_is_not_cached():
+    cache = ResponseCache()
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def main():
+        results = await asyncio.gather(*(cache.get_or_load("k", failing) for _ in range(3)), return_exceptions=True)
+        value = await cache.get_or_load("k", lambda: asyncio.sleep(0, "ok"))
+        return results, value
+
+    results, value = asyncio.run(main())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert value == "ok"
+
+
+def test_cancelled_load_cancels_waiters():
+    cache = ResponseCache()
+
+    async def main():
+        owner = asyncio.create_task(cache.get_or_load("k", lambda: asyncio.sleep(10)))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get_or_load("k", lambda: asyncio.sleep(0, "unused")))
+        await asyncio.sleep(0)
+        owner.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return await cache.get_or_load("k", lambda: asyncio.sleep(0, "retried"))
+
+    assert asyncio.run(main()) == "retried"
@@ -0,0 +1,78 @@
+"""Startup: /healthz answers before the database does, and only connection errors are retried."""
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+from sqlalchemy.exc import DBAPIError, ProgrammingError
+
+import server
+from benchmarks.startup import BACKEND_DIR, free_port, poll
+
+
+def test_first_byte_does_not_wait_for_database():
+    # Nothing listens on this port, so the bootstrap keeps retrying the connection
+    database_url = f"postgresql+asyncpg://postgres@127.0.0.1:{free_port()}/unreachable"
+    env = {**os.environ, "DATABASE_URL": database_url, "BOOTSTRAP_RETRY_INITIAL": "0.05", "BOOTSTRAP_RETRY_MAX": "0.2"}
+    port = free_port()
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'server:app', '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning'],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        assert poll(f"http://127.0.0.1:{port}/healthz", start + 10, proc) - start < 10
+        time.sleep(0.5)
+        with pytest.raises(urllib.error.HTTPError) as readyz:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/readyz", timeout=1)
+        assert readyz.value.code == 503
+        # Still retrying, and still alive
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/healthz", timeout=1) as healthz:
+            assert healthz.status == 200
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+class FakeAsyncpgError(Exception):
+    def __init__(self, sqlstate):
+        super().__init__(sqlstate)
+        self.sqlstate = sqlstate
+
+
+@pytest.mark.parametrize("error,retryable", [
+    (ConnectionRefusedError(), True),
+    (TimeoutError(), True),
+    (DBAPIError("SELECT 1", None, FakeAsyncpgError("57P03")), True),  # the database system is starting up
+    (DBAPIError("SELECT 1", None, FakeAsyncpgError("08006")), True),
+    (DBAPIError("SELECT 1", None, FakeAsyncpgError("42P01")), False),  # undefined table
+    (ProgrammingError("SELECT 1", None, Exception()), False),
+    (ValueError(), False),
+])
+def test_retryable_bootstrap_error(error, retryable):
+    assert server.retryable_bootstrap_error(error) is retryable
+
+
+def test_bootstrap_retries_connection_errors_then_gives_up(client, run, monkeypatch):
+    errors = [ConnectionRefusedError(), OSError(), RuntimeError("bad migration")]
+
+    async def failing_migrations(conn):
+        raise errors.pop(0)
+
+    monkeypatch.setattr(server, "readiness", server.Readiness())
+    monkeypatch.setattr(server, "run_migrations", failing_migrations)
+    monkeypatch.setattr(server, "BOOTSTRAP_RETRY_INITIAL", 0.01)
+    run(server.bootstrap)
+
+    assert not errors
+    assert server.readiness.attempts == 3
+    assert server.readiness.failed and not server.readiness.ready
+    assert server.readiness.last_error == "RuntimeError"
+    healthz = client.get("/healthz")
+    assert healthz.status_code == 503
+    assert healthz.json()["status"] == "failed"
+    assert client.get("/readyz").status_code == 503
+    assert client.get("/api/districts").status_code == 503
@@ -0,0 +1,57 @@
+"""State-scoped views: versions, analytics snapshots and push updates follow the districts and states written."""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import server
+from bulk_load import load_metric_rows
+
+STATE = "ZY"
+FRESH, STALE = "ZY01", "ZY02"
+
+
+async def load_metrics():
+    await load_metric_rows(server.mock_metric_rows([FRESH], 3))
+    # STALE stopped reporting five years ago
+    await load_metric_rows(server.mock_metric_rows([STALE], 3, datetime.now(timezone.utc) - timedelta(days=5 * 365)))
+
+
+@pytest.fixture(scope="module")
+def state_districts(scratch_districts, client):
+    scratch_districts([FRESH, STALE], STATE)
+    client.portal.call(load_metrics)
+
+
+def test_snapshot_includes_stale_districts_like_state_statistics(state_districts, client):
+    statistics = client.get("/api/metrics/state", params={"state": STATE}).json()
+    summary = client.get("/api/analytics/summary", params={"state": STATE}).json()
+    comparison = client.get("/api/metrics/comparison", params={"state": STATE}).json()
+
+    totals = ("total_job_days", "total_households", "total_wages", "avg_performance")
+    assert [summary["state"][k] for k in totals] == pytest.approx([statistics[k] for k in totals])
+    for k in ("best_district", "worst_district"):
+        assert summary["state"][k] == statistics[k]
+    assert {d["district_id"] for d in comparison if d["performance_index"] is not None} == {FRESH, STALE}
+
+
+def test_explicit_ids_version_covers_their_states(state_districts, client, run):
+    params = {"ids": f"KA01,{FRESH}", "months": 3}
+    first = client.get("/api/districts/performance", params=params)
+    assert first.status_code == 200
+    # A write to another state's district changes this response, though not Karnataka's version
+    run(load_metric_rows, server.mock_metric_rows([FRESH], 1))
+    again = client.get("/api/districts/performance", params=params, headers={"If-None-Match": first.headers["etag"]})
+    assert again.status_code == 200
+    assert again.headers["etag"] != first.headers["etag"]
+
+
+def test_writes_notify_only_their_states(client, run):
+    async def notified_after(states):
+        broadcasters = {state: server.broadcaster_for(state) for state in ("KA", STATE)}
+        for broadcaster in broadcasters.values():
+            broadcaster._changed.clear()
+        server.on_metrics_written(states)
+        return {state for state, broadcaster in broadcasters.items() if broadcaster._changed.is_set()}
+
+    assert run(notified_after, {STATE}) == {STATE}
+    assert run(notified_after, None) == {"KA", STATE}